@@ -1,128 +1,120 @@
-import pm4py
 import pandas as pd
 import numpy as np
 import os
+from logcache import read_log, to_dataframe
+from durations import calculate_time_taken
+from workcalendar import load_calendar, infer_calendar, evaluate_calendar, working_time_tables
+from findings import write_findings, report
 
-# The calculation of the time taken for each event gets defined as a function
-def calculate_time_taken(df):
+# The path to the output file where the results get stored in .csv format, it is empty when the functions are imported, so the results are only written if it gets specified (like in the part at the end of the script)
+output_csv_path = ''
 
-    # Takes a dataframe representing the event log and calculates the duration of each event within a case.
-    df['time:timestamp'] = pd.to_datetime(df['time:timestamp'])
-    df = df.sort_values(['case:concept:name', 'time:timestamp'])
-    
-    # Adds a duration column to the dataframe and set duration to NaN for "start" events
-    df['duration'] = (df['time:timestamp'] - df.groupby(['case:concept:name', 'concept:name'])['time:timestamp'].shift()).dt.total_seconds()
-    df['duration'] = df['duration'].where(df['lifecycle:transition'] != 'start', np.nan)
-    
-    # Returns the dataframe with the new "duration" attribute
-    return df
+# The splitting of the events of a resource into the ones during the overlapping working times of two resources (on working days which are no holidays) and the ones while working alone gets defined as a function, the overlap is given for each weekday, events without a timestamp are in neither of them
+def split_events_by_overlap(events, times, overlapping_day, overlap_start, overlap_end):
+    weekdays = times['weekdays'][events]
+    time_of_day = times['time_of_day'][events]
+    has_time = time_of_day >= 0
+    in_overlap = has_time & overlapping_day[weekdays] & ~times['holiday'][events] & (time_of_day >= overlap_start[weekdays]) & (time_of_day <= overlap_end[weekdays])
+    return events[in_overlap], events[has_time & ~in_overlap]
 
-# The algorithm for the detection of Social Borrowing gets defined as a function
-def detect_social_borrowing(log, threshold):
+# The default working times of specific resources, they are used if no calendar is given, the working times of the other resources are inferred from the log
+default_shifts = pd.DataFrame({'resource': ['Alice', 'Bob'], 'start': ['09:00:00', '12:00:00'], 'end': ['17:00:00', '19:00:00']})
+
+# The algorithm for the detection of Social Borrowing gets defined as a function, the working times of the resources are given by a calendar (see workcalendar.py), the default shifts above are used if no calendar is given, the working times of resources without shifts in the calendar are inferred from the earliest and latest time they registered an event
+def detect_social_borrowing(log, threshold, calendar=None):
 
     # A list for the results that later get written in the output csv table is initialized, empty at first
     results = []
 
     # The event log is converted to a dataframe for easier data analysis
-    df = pm4py.convert_to_dataframe(log)
+    df = to_dataframe(log)
 
     # The duration calculation function gets called with the log converted to a dataframe to add a duration column
     df = calculate_time_taken(df)
+    durations = df['duration'].to_numpy()
 
-    # Two dictionaries are initialized for the working times of the resources, with the format 'resource':'time', empty at first
-    work_starting_times = {}
-    work_ending_times = {}
-
-    # The start and ending of the working times allocated to specific resources can be defined here if needed, and will be saved in the dictionaries
-    # Example: work_starting_times = {'Alice': pd.to_datetime('10:00:00').time(), 'Bob': pd.to_datetime('09:00:00').time()}
-    #          work_ending_times = {'Alice': pd.to_datetime('18:00:00').time(), 'Bob': pd.to_datetime('17:00:00').time()}
-    work_starting_times = {'Alice': pd.to_datetime('09:00:00').time(), 'Bob': pd.to_datetime('12:00:00').time()}
-    work_ending_times = {'Alice': pd.to_datetime('17:00:00').time(), 'Bob': pd.to_datetime('19:00:00').time()}
-
-
-    # Default working times for resources without specified working times are set here
-    for resource in df['org:resource'].unique():
-        if resource not in work_starting_times:
+    # The working times of the resources are completed with the ones inferred from the log, and the time of day and weekday of each event are calculated once on the int64 timestamps
+    if calendar is None:
+        calendar = load_calendar(default_shifts)
+    specified_resources = list(calendar['shifts'])
+    calendar = infer_calendar(df, calendar)
+    times = evaluate_calendar(df, calendar)
+    starts, ends = working_time_tables(calendar, times['resource_lookup'])
 
-            # The earliest time registered for the resource gets retrieved and allocated as the work starting time
-            earliest_event_time = df[df['org:resource'] == resource]['time:timestamp'].dt.time.min()
-            work_starting_times[resource] = earliest_event_time
-
-        if resource not in work_ending_times:
-
-            # The latest time registered for the resource gets retrieved and allocated as the work ending time
-            latest_event_time = df[df['org:resource'] == resource]['time:timestamp'].dt.time.max()
-            work_ending_times[resource] = latest_event_time
+    # The events of each resource are retrieved once, in the order of the log
+    resource_codes = times['resource_codes']
+    events_by_resource = np.argsort(resource_codes, kind='stable')
+    boundaries = np.searchsorted(resource_codes[events_by_resource], np.arange(len(starts)))
+    events_of_resource = [events_by_resource[boundaries[code]:boundaries[code + 1]] for code in range(len(starts) - 1)]
 
+    # The resources with specified working times are regarded first, then in the order they appear in the log, events without a resource are not regarded
+    resource_order = list(dict.fromkeys([code for code in times['resource_lookup'].get_indexer(specified_resources) if code >= 0] + [code for code in pd.unique(resource_codes) if code >= 0]))
 
     # It is iterated through each pair of resources
-    for resource1 in work_starting_times:
-        for resource2 in work_starting_times:
-            if resource1 != resource2:
+    for code1 in resource_order:
+        for code2 in resource_order:
+            if code1 != code2:
+                resource1, resource2 = times['resource_lookup'][code1], times['resource_lookup'][code2]
 
-                # The time interval where the working times of the two resources overlap is calculated and stored
-                overlap_start = max(work_starting_times[resource1], work_starting_times[resource2])
-                overlap_end = min(work_ending_times[resource1], work_ending_times[resource2])
+                # The time interval where the working times of the two resources overlap is calculated and stored for each weekday
+                overlap_start = np.maximum(starts[code1], starts[code2])
+                overlap_end = np.minimum(ends[code1], ends[code2])
+                overlapping_day = (starts[code1] >= 0) & (starts[code2] >= 0) & (overlap_start < overlap_end)
 
                 # If the working times don't overlap at all, the pair gets skipped
-                if (work_starting_times[resource1] > work_ending_times[resource2]) or (work_starting_times[resource2] > work_ending_times[resource1]):
-                    pass
-
-                # Otherwise it is continued
-                elif overlap_start < overlap_end:
-
-                    # The subset of the dataframe for the pair of resources during the overlapping work times is retrieved
-                    pair_df = df[(df['org:resource'].isin([resource1, resource2])) &
-                                 (df['time:timestamp'].dt.time >= overlap_start) &
-                                 (df['time:timestamp'].dt.time <= overlap_end)]
-
-                    # The subset of the dataframe for each resource alone is retrieved
-                    alone_df_resource1 = df[(df['org:resource'] == resource1) &
-                                            ((df['time:timestamp'].dt.time < overlap_start) | (df['time:timestamp'].dt.time > overlap_end))]
-                    alone_df_resource2 = df[(df['org:resource'] == resource2) &
-                                            ((df['time:timestamp'].dt.time < overlap_start) | (df['time:timestamp'].dt.time > overlap_end))]
-
-                    # The average duration each of the resources needs for tasks while the working times overlap and while working alone are calculated and stored
-                    mean_duration_resource1_alone = alone_df_resource1['duration'].mean()
-                    mean_duration_resource2_alone = alone_df_resource2['duration'].mean()
-                    mean_duration_resource1_overlap = pair_df[pair_df['org:resource'] == resource1]['duration'].mean()
-                    mean_duration_resource2_overlap = pair_df[pair_df['org:resource'] == resource2]['duration'].mean()
-
-                    # Condition for Social Borrowing, if the performance of a resource seems to correlate with the working times of another resource
-                    if (mean_duration_resource1_overlap < (mean_duration_resource1_alone * threshold)) and (mean_duration_resource2_overlap >= mean_duration_resource2_alone):
-                        print(f"Possible Social Borrowing detected, {resource2} is a possible victim of {resource1}")
-
-                        # The results get stored in the results list
-                        results_entry = {
-                            'Initiating Resource': resource1,
-                            'Victim Resource': resource2,
-                            'Initiating Resource Average Time (Alone)': mean_duration_resource1_alone,
-                            'Initiating Resource Average Time (Overlap)': mean_duration_resource1_overlap,
-                            'Victim Resource Average Time (Alone)': mean_duration_resource2_alone,
-                            'Victim Resource Average Time (Overlap)': mean_duration_resource2_overlap,
-                            'Explanation': 'The potentially borrowing resource needs significantly more time for tasks made while the other resource is not present'
-                        }
-                        results.append(results_entry)
+                if not overlapping_day.any():
+                    continue
+
+                # The events of each resource during the overlapping work times and while working alone are retrieved
+                overlap_events_resource1, alone_events_resource1 = split_events_by_overlap(events_of_resource[code1], times, overlapping_day, overlap_start, overlap_end)
+                overlap_events_resource2, alone_events_resource2 = split_events_by_overlap(events_of_resource[code2], times, overlapping_day, overlap_start, overlap_end)
+
+                # The average duration each of the resources needs for tasks while the working times overlap and while working alone are calculated and stored
+                mean_duration_resource1_alone = pd.Series(durations[alone_events_resource1]).mean()
+                mean_duration_resource2_alone = pd.Series(durations[alone_events_resource2]).mean()
+                mean_duration_resource1_overlap = pd.Series(durations[overlap_events_resource1]).mean()
+                mean_duration_resource2_overlap = pd.Series(durations[overlap_events_resource2]).mean()
+
+                # Condition for Social Borrowing, if the performance of a resource seems to correlate with the working times of another resource
+                if (mean_duration_resource1_overlap < (mean_duration_resource1_alone * threshold)) and (mean_duration_resource2_overlap >= mean_duration_resource2_alone):
+                    report(f"Possible Social Borrowing detected, {resource2} is a possible victim of {resource1}")
+
+                    # The results get stored in the results list
+                    results_entry = {
+                        'Initiating Resource': resource1,
+                        'Victim Resource': resource2,
+                        'Initiating Resource Average Time (Alone)': mean_duration_resource1_alone,
+                        'Initiating Resource Average Time (Overlap)': mean_duration_resource1_overlap,
+                        'Victim Resource Average Time (Alone)': mean_duration_resource2_alone,
+                        'Victim Resource Average Time (Overlap)': mean_duration_resource2_overlap,
+                        'Explanation': 'The potentially borrowing resource needs significantly more time for tasks made while the other resource is not present'
+                    }
+                    results.append(results_entry)
 
     # The results are written to a csv table if an according path got specified
-    if output_csv_path:
-        results_df = pd.DataFrame(results)
-        results_df.to_csv(output_csv_path, mode='a', index=False, header=not os.path.exists(output_csv_path))
-        print(f"Results appended to {output_csv_path}")
+    write_findings(results, output_csv_path)
+
+# The following part only gets executed if the script is run directly, so the functions above can also be imported without running the detection
+if __name__ == "__main__":
+
+    # Specify the path to the event log in .xes format
+    log_path = "C:\\Users\\tbjac\\Documents\\uni\\bachelorarbeit\\pattern detection codes\\example logs\\13_socialborrowing.xes"
+    log = read_log(log_path)
 
-# Specify the path to the event log in .xes format
-log_path = "C:\\Users\\tbjac\\Documents\\uni\\bachelorarbeit\\pattern detection codes\\example logs\\13_socialborrowing.xes"
-log = pm4py.read_xes(log_path)
+    # Specify the path to the output file where the results get stored in .csv format, can also be left empty, then this part just gets skipped
+    output_csv_path = "C:\\Users\\tbjac\\Documents\\uni\\bachelorarbeit\\pattern detection codes\\csv results\\13_socialborrowing_results.csv"
 
-# Specify the path to the output file where the results get stored in .csv format, can also be left empty, then this part just gets skipped
-output_csv_path = "C:\\Users\\tbjac\\Documents\\uni\\bachelorarbeit\\pattern detection codes\\csv results\\13_socialborrowing_results.csv"
+    # Set a dynamic threshold for significant difference between the duration for tasks the "borrowing" resource needs while working alone or during the working times of the "victim" resource, the threshold gets scaled based on the average duration of tasks performed by the potential borrower working alone. A value of e.g. 0.5 means the average duration of tasks performed by the borrower during the overlapping working times has to be less than the average duration of tasks performed by the potential borrower working alone by a factor of 50% of said average to be considered significant, so if the average duration of tasks performed by the borrower during the overlapping working times would be 1500 seconds, the average duration of the same resource working alone would have to be greater than 3000 * 0,5 = 1500 seconds to be considered significant. Similarly, with e.g. a threshold set to 1, it would have to be greater than 3000 * 1 = 3000 seconds
+    threshold = 0.5
 
-# Set a dynamic threshold for significant difference between the duration for tasks the "borrowing" resource needs while working alone or during the working times of the "victim" resource, the threshold gets scaled based on the average duration of tasks performed by the potential borrower working alone. A value of e.g. 0.5 means the average duration of tasks performed by the borrower during the overlapping working times has to be less than the average duration of tasks performed by the potential borrower working alone by a factor of 50% of said average to be considered significant, so if the average duration of tasks performed by the borrower during the overlapping working times would be 1500 seconds, the average duration of the same resource working alone would have to be greater than 3000 * 0,5 = 1500 seconds to be considered significant. Similarly, with e.g. a threshold set to 1, it would have to be greater than 3000 * 1 = 3000 seconds
-threshold = 0.5
+    # The working times of specific resources can be loaded from a table of shifts in .csv format (see 7_overworkhiding.py for the format) instead of the default shifts, the working times of the other resources are inferred from the log
+    # Example: calendar = load_calendar(default_shifts, timezone='Europe/Berlin', holidays=['2023-12-25'])
+    calendar_path = ""
+    calendar = load_calendar(calendar_path) if calendar_path else None
 
-# Clear the content of the csv file if it exists so only the results from one run are written in the file
-if os.path.exists(output_csv_path):
-    os.remove(output_csv_path)
+    # Clear the content of the csv file if it exists so only the results from one run are written in the file
+    if os.path.exists(output_csv_path):
+        os.remove(output_csv_path)
 
-# The function is called with the specified log and threshold
-detect_social_borrowing(log, threshold)
+    # The function is called with the specified log, threshold and calendar
+    detect_social_borrowing(log, threshold, calendar)
@@ -1,63 +1,93 @@
-import pm4py
-import pandas as pd
 import os
 import numpy as np
+from logcache import read_log, to_dataframe
+from findings import write_findings, report
+from compactlog import compact_log
 
-# The algorithm for the detection of Activity Deviation gets defined as a function
-def detect_activity_deviation(log):
+# The path to the output file where the results get stored in .csv format, it is empty when the functions are imported, so the results are only written if it gets specified (like in the part at the end of the script)
+output_csv_path = ''
 
-    # A list for the results that later get written in the output csv table is initialized, empty at first
-    results = []
+# The splitting of the events into k folds gets defined as a function, the first k-1 folds are drawn randomly in the order of the sample and the last fold contains the remaining events in the order of the log, so two folds give the same split as df.sample(frac=0.5, random_state=1)
+def assign_folds(num_events, k):
 
-    # The event log is converted to a dataframe for easier data analysis
-    df = pm4py.convert_to_dataframe(log)
+    # At least two folds are needed so each fold gets tested against a model built from the other ones
+    if k < 2:
+        raise ValueError(f"The number of folds k has to be at least 2, but it is {k}")
 
-    # The dataframe gets randomly split into two samples (50% are used for creating the model, 50% are tested against the model)
-    l1 = df.sample(frac=0.5, random_state=1)
-    l2 = df.drop(l1.index)
+    # Each fold needs at least one event, so a log with fewer events than k gets one fold per event (and a single fold if it has less than two events)
+    k = max(min(k, num_events), 1)
 
-    # An inner function is defined to make it possible to apply the algorithm two times, swapping the roles of the training (model) and testing dataframes in the second iteration
-    def inner_function(training_sample, testing_sample):
+    # The events are shuffled the same way df.sample shuffles them and the shuffled events are cut into k folds of (nearly) the same size
+    shuffled = np.random.RandomState(1).permutation(num_events)
+    boundaries = [round(i * num_events / k) for i in range(k)] + [num_events]
+    folds = [shuffled[boundaries[i]:boundaries[i + 1]] for i in range(k - 1)]
+    folds.append(np.sort(shuffled[boundaries[k - 1]:]))
+    return folds
 
-        # All different activities from the training segment are retrieved
-        model_activities = set(training_sample['concept:name'].unique())
+# The algorithm for the detection of Activity Deviation gets defined as a function, each fold of the log is tested against a model built from all other folds
+def detect_activity_deviation(log, k=2):
 
-        # It is iterated through each event in the log
-        for index, row in testing_sample.iterrows():
+    # A list for the results that later get written in the output csv table is initialized, empty at first
+    results = []
 
-            # Condition for Activity Deviation, if the activity represented by the regarded event is only found in the log, but not in the model
-            if row['concept:name'] not in model_activities:
-                print(f"Possible Activity Deviation detected, the activity represented by the event {row['concept:name']} from the case {row['case:concept:name']} does not occur in the model")
+    # The event log is converted to a dataframe for easier data analysis
+    df = to_dataframe(log)
+
+    # The activities are retrieved as integer codes, missing activities get their own code after the codes of all activities
+    activity_codes = compact_log(df).codes['concept:name']
+    num_activities = len(compact_log(df).lookup['concept:name']) + 1
+    activity_codes = np.where(activity_codes >= 0, activity_codes, num_activities - 1)
+
+    # The events are split into k folds (with k=2, 50% are used for creating the model and 50% are tested against the model, and then the other way around)
+    folds = assign_folds(len(df), k)
+    k = len(folds)
+    fold_of_event = np.empty(len(df), dtype=np.int64)
+    for fold, events in enumerate(folds):
+        fold_of_event[events] = fold
+
+    # A matrix of which activities are present in which fold is created in one pass, the model of each fold contains all activities present in any of the other folds
+    presence = np.zeros((k, num_activities), dtype=np.int64)
+    presence[fold_of_event, activity_codes] = 1
+    in_model = (presence.sum(axis=0) - presence) > 0
+
+    # Condition for Activity Deviation, if the activity represented by an event is only found in the log, but not in the model
+    deviating = ~in_model[fold_of_event, activity_codes]
+
+    # The folds are tested starting with the last fold, just like the testing segment comes first in the two-fold split, the deviating events are reported in the order they are tested in
+    activities = df['concept:name'].to_numpy()
+    cases = df['case:concept:name'].to_numpy()
+    for events in [folds[-1]] + folds[:-1]:
+        for event in events[deviating[events]]:
+            report(f"Possible Activity Deviation detected, the activity represented by the event {activities[event]} from the case {cases[event]} does not occur in the model")
+
+            # The results get stored in the results list
+            results_entry = {
+                'Activity': activities[event],
+                'Case': cases[event],
+                'Explanation': 'The activity does occur in the log, but not in the model'
+            }
+            results.append(results_entry)
 
-                # The results get stored in the results list
-                results_entry = {
-                    'Activity': row['concept:name'],
-                    'Case': row['case:concept:name'],
-                    'Explanation': 'The activity does occur in the log, but not in the model'
-                }
-                results.append(results_entry)
+    # The results are written to a csv table if an according path got specified
+    write_findings(results, output_csv_path)
 
-    # The inner function is called two times, swapping the roles of the model and testing segments in the second iteration to check as much of the log as possible
-    inner_function(l1, l2)
-    inner_function(l2, l1)
 
-    # The results are written to a csv table if an according path got specified
-    if output_csv_path:
-        results_df = pd.DataFrame(results)
-        results_df.to_csv(output_csv_path, mode='a', index=False, header=not os.path.exists(output_csv_path))
-        print(f"Results appended to {output_csv_path}")
+# The following part only gets executed if the script is run directly, so the functions above can also be imported without running the detection
+if __name__ == "__main__":
 
+    # Specify the path to the event log in .xes format
+    log_path = "C:\\Users\\tbjac\\Documents\\uni\\bachelorarbeit\\pattern detection codes\\example logs\\1_activitydeviation.xes"
+    log = read_log(log_path)
 
-# Specify the path to the event log in .xes format
-log_path = "C:\\Users\\tbjac\\Documents\\uni\\bachelorarbeit\\pattern detection codes\\example logs\\1_activitydeviation.xes"
-log = pm4py.read_xes(log_path)
+    # Specify the path to the output file where the results get stored in .csv format, can also be left empty, then this part just gets skipped
+    output_csv_path = "C:\\Users\\tbjac\\Documents\\uni\\bachelorarbeit\\pattern detection codes\\csv results\\1_activitydeviation_results.csv"
 
-# Specify the path to the output file where the results get stored in .csv format, can also be left empty, then this part just gets skipped
-output_csv_path = "C:\\Users\\tbjac\\Documents\\uni\\bachelorarbeit\\pattern detection codes\\csv results\\1_activitydeviation_results.csv"
+    # Clear the content of the csv file if it exists so only the results from one run are written in the file
+    if os.path.exists(output_csv_path):
+        os.remove(output_csv_path)
 
-# Clear the content of the csv file if it exists so only the results from one run are written in the file
-if os.path.exists(output_csv_path):
-    os.remove(output_csv_path)
+    # Specify the number of folds the log is split into, each fold is tested against a model built from all other folds
+    k = 2
 
-# The function is called with the specified log
-detect_activity_deviation(log)
+    # The function is called with the specified log
+    detect_activity_deviation(log, k)
@@ -1,72 +1,105 @@
-import pm4py
-import pandas as pd
+import numpy as np
 import os
+from logcache import read_log, to_dataframe
+from findings import write_findings, report
+from compactlog import compact_log
 
-# The algorithm for the detection of Originator Deviation gets defined as a function
+# The path to the output file where the results get stored in .csv format, it is empty when the functions are imported, so the results are only written if it gets specified (like in the part at the end of the script)
+output_csv_path = ''
+
+# The first position of each code in a range of positions gets defined as a function, codes that don't occur in the range are not included
+def first_positions(codes, start, end):
+    unique_codes, first = np.unique(codes[start:end], return_index=True)
+    return unique_codes, first + start
+
+# The algorithm for the detection of Originator Deviation gets defined as a function, all k values are evaluated in one sweep with the statistics of the training and testing segments being updated incrementally as k grows
 def detect_originator_deviation(log, min_k, max_k):
 
     # A list for the results that later get written in the output csv table is initialized, empty at first
     results = []
 
-    # A set for the different couples of originators is initialized, empty at first
-    unique_originator_activity_couples = set()
+    # The event log is converted to a dataframe once for easier data analysis, the segments are slices of its rows
+    df = to_dataframe(log)
+    num_events = len(df)
+    activities = df['concept:name'].to_numpy()
+    resources = df['org:resource'].to_numpy()
+    cases = df['case:concept:name'].to_numpy()
+
+    # The activities and resources are retrieved as integer codes, each couple of originator and activity gets a code as well
+    compact = compact_log(df)
+    activity_codes = compact.codes['concept:name']
+    resource_codes = compact.codes['org:resource']
+    num_activities = len(compact.lookup['concept:name']) + 1
+    couple_codes = (resource_codes.astype(np.int64) + 1) * num_activities + activity_codes + 1
+    unique_couples, couple_codes = np.unique(couple_codes, return_inverse=True)
+    couple_activities = (unique_couples % num_activities) - 1
+    couple_resources = (unique_couples // num_activities) - 1
+    num_couples = len(unique_couples)
+
+    # The first position of each activity and each couple in the whole log, which is also the first position in every segment at the start of the log (prefix)
+    none = num_events
+    activity_prefix_first = np.full(num_activities, none)
+    unique_activities, positions = first_positions(activity_codes, 0, num_events)
+    activity_prefix_first[unique_activities] = positions
+    couple_prefix_first = np.full(num_couples, none)
+    unique_couple_codes, positions = first_positions(couple_codes, 0, num_events)
+    couple_prefix_first[unique_couple_codes] = positions
+
+    # The first position of each activity and each couple in the segment at the end of the log (suffix), they are updated incrementally while the suffix grows
+    activity_suffix_first = np.full(num_activities, none)
+    couple_suffix_first = np.full(num_couples, none)
+    suffix_start = num_events
+
+    # An array for the couples of originators and activities that were already flagged is initialized, none of them at first
+    flagged_couples = np.zeros(num_couples, dtype=bool)
 
     # It is iterated through the k values, the algorithm will get applied with each value in the range
     for k_value in range(min_k, max_k + 1):
 
-        # The log is sampled into training and testing segments, the length of l1 is len(log) - k and the length of l2 is k
-        l1 = log[:len(log) - k_value]
-        l2 = log[len(log) - k_value:]
-
-        # The segments get swapped every two iterations to check as much of the log as possible
+        # The log is sampled into training and testing segments, the length of l1 is len(log) - k and the length of l2 is k (with the same slicing of log[:len(log) - k] and log[len(log) - k:] as before)
+        split = len(range(num_events)[:num_events - k_value])
+
+        # The statistics of the suffix are updated, if it grew only the new events are regarded, otherwise (e.g. when k becomes larger than the log) they are calculated again
+        if split > suffix_start:
+            activity_suffix_first[:] = none
+            couple_suffix_first[:] = none
+            suffix_start = num_events
+        if split < suffix_start:
+            new_activities, new_positions = first_positions(activity_codes, split, suffix_start)
+            activity_suffix_first[new_activities] = new_positions
+            new_couples, new_positions = first_positions(couple_codes, split, suffix_start)
+            couple_suffix_first[new_couples] = new_positions
+            suffix_start = split
+
+        # The segments get swapped every two iterations to check as much of the log as possible, the model is built from the training segment (l1) and the testing segment (l2) is checked against it
         if k_value % 2 == 0:
-            tmp = l1
-            l1 = l2
-            l2 = tmp
-
-        # The resources (originators) assigned to the events in the training segment (l1) are stored as a model to check the testing segment against
-        model_df = pm4py.convert_to_dataframe(l1)
-
-        # A list for the events flagged with Originator Deviation is initialized, empty at first
-        flagged_events = []
-
-        # It is iterated through each event in the testing segment (l2)
-        for index, row in pm4py.convert_to_dataframe(l2).iterrows():
-
-            # The resource and activity are retrieved and stored as a tuple
-            originator_activity_couple = (row['org:resource'], row['concept:name'])
-
-            # If there is no instance of the activity represented by the regarded event in the model, it is skipped
-            if row['concept:name'] not in model_df['concept:name'].values:
-                continue
-
-            # The expected originator for the activity represented by the regarded event is retrieved
-            expected_originator = model_df.loc[model_df['concept:name'] == row['concept:name'], 'org:resource'].iloc[0]
-
-            # It is checked if the assignment from the model is respected
-            actual_originator = row['org:resource']
-            deviation_detected = expected_originator != actual_originator
-
-            # If the originator_activity_couple has already been flagged, it gets skipped
-            if originator_activity_couple in unique_originator_activity_couples:
-                continue
-
-            # Condition for Originator Deviation, if the regarded event has an originator which is not expected accodring to the model
-            if deviation_detected:
-                flagged_events.append((originator_activity_couple, expected_originator, actual_originator, row['case:concept:name'], True))
-                unique_originator_activity_couples.add(originator_activity_couple)
-
-        # It is iterated through the events flagged as possible Originator Deviation
-        for flagged_event in flagged_events:
-
-            # The attributes to be printed out are retrieved from the regarded event
-            originator_activity_couple, expected_originator, actual_originator, row['case:concept:name'], different_originator = flagged_event
-            print(f"Possible Originator Deviation detected, the activity {originator_activity_couple[1]} in Case {row['case:concept:name']} is assigned to {actual_originator}, but it should be assigned to {expected_originator} according to the model.")
+            model_first = activity_suffix_first
+            test_first = np.where(couple_prefix_first < split, couple_prefix_first, none)
+        else:
+            model_first = np.where(activity_prefix_first < split, activity_prefix_first, none)
+            test_first = couple_suffix_first
+
+        # The expected originator for each activity is the resource of its first event in the model, activities without any instance in the model are skipped
+        expected_positions = model_first[couple_activities]
+        in_model = (couple_activities >= 0) & (expected_positions < none)
+        expected_resources = np.where(in_model, resource_codes[np.minimum(expected_positions, num_events - 1)], -1)
+
+        # Condition for Originator Deviation, if the first event of a couple in the testing segment has an originator which is not expected according to the model, couples that have already been flagged get skipped
+        deviation_detected = (expected_resources != couple_resources) | (expected_resources < 0) | (couple_resources < 0)
+        flagged = np.flatnonzero((test_first < none) & in_model & deviation_detected & ~flagged_couples)
+        flagged = flagged[np.argsort(test_first[flagged], kind='stable')]
+        flagged_couples[flagged] = True
+
+        # It is iterated through the events flagged as possible Originator Deviation, in the order they occur in the testing segment
+        for couple in flagged:
+            event = test_first[couple]
+            activity, actual_originator, expected_originator = activities[event], resources[event], resources[expected_positions[couple]]
+            report(f"Possible Originator Deviation detected, the activity {activity} in Case {cases[event]} is assigned to {actual_originator}, but it should be assigned to {expected_originator} according to the model.")
 
             # The results get stored in the results list
             results_entry = {
-                'Activity': originator_activity_couple[1],
-                'Case': row['case:concept:name'],
+                'Activity': activity,
+                'Case': cases[event],
                 'Actual Originator': actual_originator,
                 'Expected Originator': expected_originator,
                 'Explanation': 'The event is assigned to a different resource than what is expected according to the model'
@@ -74,25 +107,25 @@ def detect_originator_deviation(log, min_k, max_k):
             results.append(results_entry)
 
     # The results are written to a csv table if an according path got specified
-    if output_csv_path:
-        results_df = pd.DataFrame(results)
-        results_df.to_csv(output_csv_path, mode='a', index=False, header=not os.path.exists(output_csv_path))
-        print(f"Results appended to {output_csv_path}")
+    write_findings(results, output_csv_path)
+
+# The following part only gets executed if the script is run directly, so the functions above can also be imported without running the detection
+if __name__ == "__main__":
 
-# Specify the path to the event log in .xes format
-log_path = "C:\\Users\\tbjac\\Documents\\uni\\bachelorarbeit\\pattern detection codes\\example logs\\2_originatordeviation.xes"
-log = pm4py.read_xes(log_path)
+    # Specify the path to the event log in .xes format
+    log_path = "C:\\Users\\tbjac\\Documents\\uni\\bachelorarbeit\\pattern detection codes\\example logs\\2_originatordeviation.xes"
+    log = read_log(log_path)
 
-# Specify the minimum and maximum values of k, k determines the length of the training and testing segments of the sampled log
-min_k_value = 1
-max_k_value = 8
+    # Specify the minimum and maximum values of k, k determines the length of the training and testing segments of the sampled log
+    min_k_value = 1
+    max_k_value = 8
 
-# Specify the path to the output file where the results get stored in .csv format, can also be left empty, then this part just gets skipped
-output_csv_path = "C:\\Users\\tbjac\\Documents\\uni\\bachelorarbeit\\pattern detection codes\\csv results\\2_originatordeviation_results.csv"
+    # Specify the path to the output file where the results get stored in .csv format, can also be left empty, then this part just gets skipped
+    output_csv_path = "C:\\Users\\tbjac\\Documents\\uni\\bachelorarbeit\\pattern detection codes\\csv results\\2_originatordeviation_results.csv"
 
-# Clear the content of the csv file if it exists so only the results from one run are written in the file
-if os.path.exists(output_csv_path):
-    os.remove(output_csv_path)
+    # Clear the content of the csv file if it exists so only the results from one run are written in the file
+    if os.path.exists(output_csv_path):
+        os.remove(output_csv_path)
 
-# The function is called with the specified log and k values
-detect_originator_deviation(log, min_k_value, max_k_value)
+    # The function is called with the specified log and k values
+    detect_originator_deviation(log, min_k_value, max_k_value)
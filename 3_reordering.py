@@ -1,32 +1,86 @@
-import pm4py
 import pandas as pd
-from collections import defaultdict
 import numpy as np
 import os
+from logcache import read_log
+from xesstream import iter_chunks
+from findings import write_findings, report, sort_by_case
+
+# The path to the output file where the results get stored in .csv format, it is empty when the functions are imported, so the results are only written if it gets specified (like in the part at the end of the script)
+output_csv_path = ''
+
+# The normalization of a sequence of activities gets defined as a function, an index is added to each activity starting from 1 and the activities are compared in lower case without surrounding whitespace
+def normalize_sequence(activities):
+    return tuple(f"{i}.{activity}".lower().strip() for i, activity in enumerate(activities, start=1))
+
+# The building of an index of the variants (the different normalized sequences of activities) gets defined as a function, it consists of a hash set of the variants and a prefix trie, in which the end of a variant is marked with the key None
+def build_variant_index(variants):
+    trie = {}
+    for variant in variants:
+        node = trie
+        for activity in variant:
+            node = node.setdefault(activity, {})
+        node[None] = True
+    return {'variants': set(variants), 'trie': trie}
+
+# The lookup of a sequence of activities in the variant index gets defined as a function, a sequence matches a learned order if one of them is the start of the other (or they are the same), if it matches None is returned, otherwise the position at which the sequence diverges from all learned orders
+def match_variant(variant_index, sequence):
+    if sequence in variant_index['variants']:
+        return None
+    node = variant_index['trie']
+    for position, activity in enumerate(sequence):
+        if None in node:
+            return None
+        if activity not in node:
+            return position
+        node = node[activity]
+    return None
 
 # An algorithm for generating the possible orders of activities from the cases in the training segment gets defined as a function, this serves as the model here
 def generate_activity_orders(l1):
 
-    # A defaultdict for the possible activity orders is initialized, empty at first
-    activity_orders = defaultdict(list)
+    # A set for the possible activity orders is initialized, empty at first
+    variants = set()
 
-    # The training log is grouped by cases
-    grouped_cases = l1.groupby('case:concept:name')
+    # The training log is iterated through in chunks of complete cases (a path to an event log in .xes format gets streamed chunk by chunk)
+    for l1_chunk in iter_chunks(l1):
 
-    # It is iterated through each case
-    for case, activities in grouped_cases:
+        # The training log is grouped by cases
+        grouped_cases = l1_chunk.groupby('case:concept:name')
 
-        # The activities are ordered based on their timestamps
-        ordered_activities = activities.sort_values('time:timestamp')
+        # It is iterated through each case
+        for case, activities in grouped_cases:
 
-        # The activites of these ordered activities get converted to a list of dictionaries where each dictionary represents an activity, and an index is added to each activity starting from 1.
-        activity_sequence = [f"{i}.{activity['concept:name']}" for i, activity in enumerate(ordered_activities.to_dict(orient='records'), start=1)]
+            # The activities are ordered based on their timestamps
+            ordered_activities = activities.sort_values('time:timestamp')
 
-        # The sequence of activities for the regarded case with their activities is appended to the activity_orders dictionary
-        activity_orders[case].append((activity_sequence,))
+            # The normalized sequence of activities for the regarded case is added to the possible activity orders
+            variants.add(normalize_sequence(ordered_activities['concept:name']))
 
-    # The dictionary containing all possible orders of activities according to the cases in the training segment is returned
-    return activity_orders
+    # The index of all possible orders of activities according to the cases in the training segment is returned
+    return build_variant_index(variants)
+
+# The sampling of the cases into training cases and testing cases gets defined as a function
+def sample_cases(cases):
+
+    # The cases are shuffled randomly and then sampled into training cases and testing cases, they are shuffled as an array of objects, whatever type of array the case names came in
+    cases = np.array(cases, dtype=object)
+    np.random.seed(0)
+    np.random.shuffle(cases)
+    split_idx = len(cases) // 2
+    training_cases = cases[:split_idx]
+    testing_cases = cases[split_idx:]
+    return training_cases, testing_cases
+
+# The sampling of the log into a training segment and a testing segment gets defined as a function
+def split_cases(log):
+
+    # The cases of the log are sampled into training cases and testing cases
+    training_cases, testing_cases = sample_cases(log['case:concept:name'].unique())
+
+    # A training segment and a testing segment are created from the sampled cases and returned
+    l1 = log[log['case:concept:name'].isin(training_cases)]
+    l2 = log[log['case:concept:name'].isin(testing_cases)]
+    return l1, l2
 
 # The algorithm for the detection of Re-Ordering gets defined as a function
 def detect_reordering(l2, activity_orders):
@@ -34,87 +88,75 @@ def detect_reordering(l2, activity_orders):
     # A list for the results that later get written in the output csv table is initialized, empty at first
     results = []
 
-    # It is iterated through each case
-    for case, events in l2.groupby('case:concept:name'):
-
-        # The events are ordered based on their timestamps
-        ordered_events = events.sort_values('time:timestamp')
-
-        # The activites of these ordered events get converted to a list of dictionaries where each dictionary represents an event, and an index is added to each event starting from 1.
-        activity_sequence = [f"{i}.{event['concept:name']}" for i, event in enumerate(ordered_events.to_dict(orient='records'), start=1)]
-
-        # It gets assumed that Re-Ordering is present first
-        reordering = True
-
-        # It is iterated through each possible order in the generated model
-        for learned_orders in activity_orders.values():
-            for learned_order in learned_orders:
-
-                # If all activities in the sequence match the regarded order from the model, there is no Re-Ordering in this sequence of events
-                if all(event.lower().strip() == learned_activity.lower().strip() for event, learned_activity in zip(activity_sequence, learned_order[0])):
-                    reordering = False
-                    break
-
-            # If the sequence of events already matched one order from the model, the remaining orders don't have to be regarded anymore
-            if reordering == False:
-                break
-
-        # Condition for Re-Ordering, if the regarded sequence of activities (= activities in a case) doesn't match any of the possible avtivity orders from the generated model
-        if reordering == True:
-            print(f"Possible Re-Ordering detected, the case {case} contains a sequence of activities that does not match any sequence from the model. Following activities in this case occur in an unexpected order: ", end="")
-            first = True
-            for activity, learned_activity in zip(activity_sequence, learned_order[0]):
-                if activity.lower().strip() != learned_activity.lower().strip():
-                    if first == True:
-                        print(f"{activity}", end="")
-                    else:
-                        print(f", {activity}", end="")
-                    first = False
-            print()
-
-            # The results get stored in the results list
-            results_entry = {
-                'Case': case,
-                'Explanation': 'The case contains an unexpected sequence of activities'
-            }
-            results.append(results_entry)
-
-    # The results are written to a csv table if an according path got specified
-    if output_csv_path:
-        results_df = pd.DataFrame(results)
-        results_df.to_csv(output_csv_path, mode='a', index=False, header=True)
-        print(f"Results appended to {output_csv_path}")
-
-
-# Specify the path to the event log in .xes format
-log_path = "C:\\Users\\tbjac\\Documents\\uni\\bachelorarbeit\\pattern detection codes\\example logs\\3_reordering.xes"
-log = pm4py.read_xes(log_path)
-
-# The cases are shuffled randomly and then sampled into training cases and testing cases
-np.random.seed(0)
-cases = log['case:concept:name'].unique()
-np.random.shuffle(cases)
-split_idx = len(cases) // 2
-training_cases = cases[:split_idx]
-testing_cases = cases[split_idx:]
-
-# A training segment and a testing segment are created from the sampled cases
-l1 = log[log['case:concept:name'].isin(training_cases)]
-l2 = log[log['case:concept:name'].isin(testing_cases)]
-
-# A model of possible activity orders is generated by calling the corresponding function
-activity_orders = generate_activity_orders(l1)
-
-# Specify the path to the output file where the results get stored in .csv format, can also be left empty, then this part just gets skipped
-output_csv_path = "C:\\Users\\tbjac\\Documents\\uni\\bachelorarbeit\\pattern detection codes\\csv results\\3_reordering_results.csv"
-
-# Clear the content of the csv file if it exists so only the results from one run are written in the file
-if os.path.exists(output_csv_path):
-    os.remove(output_csv_path)
-
-# The function is called with the testing log and event orders
-detect_reordering(l2, activity_orders)
-
-# The roles of training and testing logs are swapped and the algorithm is applied again to check as much of the log as possible
-activity_orders = generate_activity_orders(l2)
-detect_reordering(l1, activity_orders)
+    # The testing log is iterated through in chunks of complete cases (a path to an event log in .xes format gets streamed chunk by chunk)
+    for l2_chunk in iter_chunks(l2):
+
+        # It is iterated through each case
+        for case, events in l2_chunk.groupby('case:concept:name'):
+
+            # The events are ordered based on their timestamps
+            ordered_events = events.sort_values('time:timestamp')
+
+            # The activities of these ordered events get converted to a sequence with an index added to each activity starting from 1
+            activity_sequence = [f"{i}.{activity}" for i, activity in enumerate(ordered_events['concept:name'], start=1)]
+
+            # The sequence is looked up in the index of possible orders from the generated model, if it doesn't match any of them the position at which it diverges from all of them is returned
+            divergence = match_variant(activity_orders, normalize_sequence(ordered_events['concept:name']))
+
+            # Condition for Re-Ordering, if the regarded sequence of activities (= activities in a case) doesn't match any of the possible avtivity orders from the generated model
+            if divergence is not None:
+                report(f"Possible Re-Ordering detected, the case {case} contains a sequence of activities that does not match any sequence from the model. Following activities in this case occur in an unexpected order: {', '.join(activity_sequence[divergence:])}")
+
+                # The results get stored in the results list
+                results_entry = {
+                    'Case': case,
+                    'Explanation': 'The case contains an unexpected sequence of activities'
+                }
+                results.append(results_entry)
+
+    # The results are sorted by case, so they are in the same order whether the log was regarded at once or streamed chunk by chunk, and written to a csv table if an according path got specified
+    write_findings(sort_by_case(results), output_csv_path, header=True)
+
+# The detection of Re-Ordering in an event log in .xes format that is streamed chunk by chunk gets defined as a function, the log is read once to sample the cases and then once for each model and each testing segment, so only one chunk of cases (and the model) is held in memory at a time
+def detect_reordering_streaming(log_path, traces_per_chunk=1000):
+
+    # The cases of the log are collected and sampled into training cases and testing cases, just like in split_cases
+    cases = pd.concat([chunk['case:concept:name'].drop_duplicates() for chunk in iter_chunks(log_path, traces_per_chunk)]).unique()
+    training_cases, testing_cases = sample_cases(cases)
+
+    # A segment of the log is streamed by filtering each chunk for the sampled cases
+    def stream_segment(segment_cases):
+        for chunk in iter_chunks(log_path, traces_per_chunk):
+            yield chunk[chunk['case:concept:name'].isin(segment_cases)]
+
+    # The algorithm is applied two times, swapping the roles of the training and testing segments in the second iteration
+    detect_reordering(stream_segment(testing_cases), generate_activity_orders(stream_segment(training_cases)))
+    detect_reordering(stream_segment(training_cases), generate_activity_orders(stream_segment(testing_cases)))
+
+
+# The following part only gets executed if the script is run directly, so the functions above can also be imported without running the detection
+if __name__ == "__main__":
+
+    # Specify the path to the event log in .xes format
+    log_path = "C:\\Users\\tbjac\\Documents\\uni\\bachelorarbeit\\pattern detection codes\\example logs\\3_reordering.xes"
+    log = read_log(log_path)
+
+    # The log is sampled into a training segment and a testing segment
+    l1, l2 = split_cases(log)
+
+    # A model of possible activity orders is generated by calling the corresponding function
+    activity_orders = generate_activity_orders(l1)
+
+    # Specify the path to the output file where the results get stored in .csv format, can also be left empty, then this part just gets skipped
+    output_csv_path = "C:\\Users\\tbjac\\Documents\\uni\\bachelorarbeit\\pattern detection codes\\csv results\\3_reordering_results.csv"
+
+    # Clear the content of the csv file if it exists so only the results from one run are written in the file
+    if os.path.exists(output_csv_path):
+        os.remove(output_csv_path)
+
+    # The function is called with the testing log and event orders
+    detect_reordering(l2, activity_orders)
+
+    # The roles of training and testing logs are swapped and the algorithm is applied again to check as much of the log as possible
+    activity_orders = generate_activity_orders(l2)
+    detect_reordering(l1, activity_orders)
@@ -1,6 +1,13 @@
-import pm4py
 import pandas as pd
+import numpy as np
 import os
+from logcache import read_log, to_dataframe
+from compactlog import NAT, compact_log
+from activitycube import activity_cube
+from findings import write_findings, report
+
+# The path to the output file where the results get stored in .csv format, it is empty when the functions are imported, so the results are only written if it gets specified (like in the part at the end of the script)
+output_csv_path = ''
 
 # The algorithm for the detection of the first condition of Preferential Work Selection, resources selecting certain activities more or less often than expected, gets defined as a function
 def detect_preferential_work_selection_average(log, threshold_factor):
@@ -9,139 +16,145 @@ def detect_preferential_work_selection_average(log, threshold_factor):
     results = []
 
     # The event log is converted to a dataframe for easier data analysis
-    df = pm4py.convert_to_dataframe(log)
-
-    # A dictionary is initialized for the total frequency of each activity being performed by each resource
-    activity_frequency = {resource: {} for resource in df['org:resource'].unique()}
-
-    # A dictionary is initialized for the total frequency of each activity being performed by all resources in total, empty at first
-    total_frequency = {}
-
-    # It is iterated through each event
-    for index, row in df.iterrows():
-
-        # The activity and its assigned resource are retrieved
-        activity = row['concept:name']
-        resource = row['org:resource']
-
-        # The activity_frequency dictionary gets a 2D entry for each activity being performed by each resource
-        if resource not in activity_frequency:
-            activity_frequency[resource] = {}
-        if activity not in activity_frequency[resource]:
-            activity_frequency[resource][activity] = 0
-
-        # The count of how often the regarded activity was performed by the regarded resource gets incremented
-        activity_frequency[resource][activity] += 1
+    df = to_dataframe(log)
 
-    # It is iterated through each resource and activity
-    for resource, activities in activity_frequency.items():
-        for activity, count in activities.items():
+    # The number of times each activity was performed by each resource is retrieved from the resource x activity cube of the log, which is shared with other detection functions
+    cube = activity_cube(df)
+    counts = cube['counts']
+    performed = counts > 0
 
-            # The count of how often the regarded activity was performed by all resources in total gets calculated by adding the individual counts
-            if activity not in total_frequency:
-                total_frequency[activity] = 0
-            total_frequency[activity] += count
+    # The resources are regarded in the order they first appear in the log, and the activities of each resource in the order the resource first performed them
+    first_event = np.where(performed, cube['first_event'], len(df))
+    resource_first = first_event.min(axis=1)
+    resource_order = [resource for resource in np.argsort(resource_first, kind='stable').tolist() if resource_first[resource] < len(df)]
 
-    # The average frequency of each activity being performed gets calculated and stored in a newly initialized dictionary
-    average_frequency = {activity: total_frequency[activity] / len(activity_frequency) for activity in total_frequency}
+    # The average frequency of each activity being performed gets calculated by dividing the total frequency by the amount of resources present in the log
+    total_frequency = counts.sum(axis=0)
+    average_frequency = total_frequency / len(resource_order)
 
     # The threshold gets calculated by multiplying the given threshold factor with the amount of resources present in the log
-    threshold = threshold_factor * len(df['org:resource'].unique())
-
-    # It is iterated through each resource and activity
-    for resource, activities in activity_frequency.items():
-        for activity, count in activities.items():
-
-            # The deviation from the average frequency is calculated by subtracting the average frequency of an activity being performed of the indivual frequency
-            deviation = count - average_frequency[activity]
+    threshold = threshold_factor * len(resource_order)
 
-            # Checks if the deviation is significant
-            if abs(deviation) > threshold:
+    # The deviation from the average frequency is calculated by subtracting the average frequency of an activity being performed of the indivual frequency
+    deviation = counts - average_frequency
 
-                # First condition for Preferential Work Selection, if a resource performed an activity significantly more than expected
-                if deviation > 0:
-                    print(f"Possible Preferential Work Selection detected, resource {resource} has performed activity {activity} {count} times, while it was performed {average_frequency[activity]} times on average. That is significantly more than expected.")
+    # First condition for Preferential Work Selection, if a resource performed an activity significantly more than expected
+    significantly_more = performed & (np.abs(deviation) > threshold) & (deviation > 0)
 
-                    # The results get stored in the results list
-                    results_entry = {
-                        'Resource': resource,
-                        'Activity': activity,
-                        'Case': '',
-                        'Resource Frequency': count,
-                        'Average Frequency': average_frequency[activity],
-                        'Explanation': 'The resource conducted the activity significantly more than expected'
-                    }
-                    results.append(results_entry)
+    # It is iterated through each resource and activity
+    for resource_code in resource_order:
+        for activity_code in np.argsort(first_event[resource_code], kind='stable').tolist():
+            if not performed[resource_code, activity_code]:
+                break
+            if significantly_more[resource_code, activity_code]:
+                resource, activity = cube['resources'][resource_code], cube['activities'][activity_code]
+                count, average = counts[resource_code, activity_code].item(), average_frequency[activity_code].item()
+                report(f"Possible Preferential Work Selection detected, resource {resource} has performed activity {activity} {count} times, while it was performed {average} times on average. That is significantly more than expected.")
 
+                # The results get stored in the results list
+                results_entry = {
+                    'Resource': resource,
+                    'Activity': activity,
+                    'Case': '',
+                    'Resource Frequency': count,
+                    'Average Frequency': average,
+                    'Explanation': 'The resource conducted the activity significantly more than expected'
+                }
+                results.append(results_entry)
 
     # The results are written to a csv table if an according path got specified
-    if output_csv_path:
-        results_df = pd.DataFrame(results)
-        results_df.to_csv(output_csv_path, mode='a', index=False, header=not os.path.exists(output_csv_path))
-        print(f"Results appended to {output_csv_path}")
+    write_findings(results, output_csv_path)
 
-# The algorithm for the detection of the second condition of Preferential Work Selection, resources starting a new activity despite not having completed another one (therefore not following First Come First Served),  gets defined as a function
+# The algorithm for the detection of the second condition of Preferential Work Selection, resources starting a new activity despite not having completed another one (therefore not following First Come First Served),  gets defined as a function, the start events of each resource are swept in the order of their timestamps instead of filtering the whole log for each start event
 def detect_preferential_work_selection_fcfs(log):
 
     # A list for the results that later get written in the output csv table is initialized, empty at first
     results = []
 
     # The event log is converted to a dataframe for easier data analysis
-    df = pm4py.convert_to_dataframe(log)
-
-    # It is iterated through each time an activity is started in the log
-    for _, start_activity in df[df['lifecycle:transition'] == 'start'].iterrows():
-
-        # The start timestamp is retrieved
-        start_timestamp = pd.to_datetime(start_activity['time:timestamp'])
-
-        # Find the first valid complete timestamp for the corresponding activity
-        complete_timestamp = pd.to_datetime(df[(df['case:concept:name'] == start_activity['case:concept:name']) & (df['org:resource'] == start_activity['org:resource']) & (df['lifecycle:transition'] == 'complete') & (df['concept:name'] == start_activity['concept:name'])]['time:timestamp'].min())
-
-        # After a valid complete timestamp was found, it is searched for other activities being started between the two previously retrieved (and related) timestamps by the same resource
-        if pd.notna(complete_timestamp):
-            for _, new_start_activity in df[(df['lifecycle:transition'] == 'start') & (df['org:resource'] == start_activity['org:resource']) & (df['case:concept:name'] != start_activity['case:concept:name']) & (df['time:timestamp'] > start_timestamp) & (df['time:timestamp'] < complete_timestamp)].iterrows():
-
-                # Second condition for Preferential Work Selection, if a resource started a new activity while not having completed another activity in another case
-                print(f"Possible Preferential Work Selection detected, resource {start_activity['org:resource']} started activity {new_start_activity['concept:name']} in case {new_start_activity['case:concept:name']} at {new_start_activity['time:timestamp']} while still not having completed activity {start_activity['concept:name']} in case {start_activity['case:concept:name']} at {complete_timestamp}")
-
-                # The results get stored in the results list
-                results_entry = {
-                    'Resource': start_activity['org:resource'],
-                    'Activity': new_start_activity['concept:name'],
-                    'Case': new_start_activity['case:concept:name'],
-                    'Resource Frequency': '',
-                    'Average Frequency': '',
-                    'Explanation': 'The resource started the activity while still being involved in another case'
-                }
-                results.append(results_entry)
+    df = to_dataframe(log)
+
+    # The compact representation of the log is retrieved, so the events are compared by their integer codes and int64 timestamps instead of strings
+    compact = compact_log(df)
+    case_codes = compact.codes['case:concept:name']
+    resource_codes = compact.codes['org:resource']
+    activity_codes = compact.codes['concept:name']
+    timestamps = compact.timestamps
+    valid = (case_codes >= 0) & (resource_codes >= 0) & (activity_codes >= 0) & (timestamps != NAT)
+    starts = np.flatnonzero(compact.mask('lifecycle:transition', 'start') & valid)
+    completes = np.flatnonzero(compact.mask('lifecycle:transition', 'complete') & valid)
+
+    # The first valid complete event for the corresponding activity (same case, resource and activity) of each start event is retrieved
+    complete_events = pd.DataFrame({'case': case_codes[completes], 'resource': resource_codes[completes], 'activity': activity_codes[completes], 'timestamp': timestamps[completes]}, index=completes)
+    first_completes = complete_events.groupby(['case', 'resource', 'activity'])['timestamp'].idxmin()
+    found = first_completes.index.get_indexer(pd.MultiIndex.from_arrays([case_codes[starts], resource_codes[starts], activity_codes[starts]]))
+    complete_of_start = np.append(first_completes.to_numpy(), -1)[found]
+
+    # The timestamps are replaced by their ranks, so they can be combined with the resource into one sort key, and the start events are sorted by resource and timestamp
+    times = np.unique(timestamps[starts])
+    width = len(times) + 1
+    start_ranks = np.searchsorted(times, timestamps[starts])
+    order = np.lexsort((start_ranks, resource_codes[starts]))
+    start_keys = resource_codes[starts][order].astype(np.int64) * width + start_ranks[order]
+
+    # For each start event with a valid complete timestamp, the start events of the same resource between the two timestamps are the ones in the range between the two searched positions
+    has_complete = complete_of_start >= 0
+    window_start = np.searchsorted(start_keys, resource_codes[starts].astype(np.int64) * width + start_ranks, side='right')
+    window_end = np.searchsorted(start_keys, resource_codes[starts].astype(np.int64) * width + np.searchsorted(times, timestamps[np.maximum(complete_of_start, 0)]), side='left')
+
+    # The pairs of each start event and the start events in its window are created, only start events of the same resource in other cases count
+    window_start, window_end = window_start[has_complete], np.maximum(window_end[has_complete], window_start[has_complete])
+    window_sizes = window_end - window_start
+    pair_starts = np.repeat(starts[has_complete], window_sizes)
+    pair_completes = np.repeat(complete_of_start[has_complete], window_sizes)
+    pair_new_starts = starts[order[np.repeat(window_start - np.cumsum(window_sizes) + window_sizes, window_sizes) + np.arange(window_sizes.sum())]]
+    other_case = case_codes[pair_new_starts] != case_codes[pair_starts]
+    pair_starts, pair_completes, pair_new_starts = pair_starts[other_case], pair_completes[other_case], pair_new_starts[other_case]
+
+    # The pairs are sorted in the order of the log, first by the start event and then by the start event in its window
+    pair_order = np.lexsort((pair_new_starts, pair_starts))
+    activities = df['concept:name'].to_numpy()
+    resources = df['org:resource'].to_numpy()
+    cases = df['case:concept:name'].to_numpy()
+    event_timestamps = df['time:timestamp'].to_numpy(dtype=object)
+
+    # It is iterated through each pair of a start event and a start event of another case before its completion
+    for start, complete, new_start in zip(pair_starts[pair_order].tolist(), pair_completes[pair_order].tolist(), pair_new_starts[pair_order].tolist()):
+
+        # Second condition for Preferential Work Selection, if a resource started a new activity while not having completed another activity in another case
+        report(f"Possible Preferential Work Selection detected, resource {resources[start]} started activity {activities[new_start]} in case {cases[new_start]} at {event_timestamps[new_start]} while still not having completed activity {activities[start]} in case {cases[start]} at {event_timestamps[complete]}")
+
+        # The results get stored in the results list
+        results_entry = {
+            'Resource': resources[start],
+            'Activity': activities[new_start],
+            'Case': cases[new_start],
+            'Resource Frequency': '',
+            'Average Frequency': '',
+            'Explanation': 'The resource started the activity while still being involved in another case'
+        }
+        results.append(results_entry)
 
     # The results are written to a csv table if an according path got specified
-    if output_csv_path:
-        results_df = pd.DataFrame(results)
-        results_df.to_csv(output_csv_path, mode='a', index=False, header=not os.path.exists(output_csv_path))
-        print(f"Results appended to {output_csv_path}")
+    write_findings(results, output_csv_path)
 
-    # The results are written to a csv table if an according path got specified
-    if output_csv_path:
-        results_df = pd.DataFrame(results)
-        results_df.to_csv(output_csv_path, mode='a', index=False, header=not os.path.exists(output_csv_path))
-        print(f"Results appended to {output_csv_path}")
+# The following part only gets executed if the script is run directly, so the functions above can also be imported without running the detection
+if __name__ == "__main__":
 
-# Specify the path to the event log in .xes format
-log_path = "C:\\Users\\tbjac\\Documents\\uni\\bachelorarbeit\\pattern detection codes\\example logs\\4_preferentialworkselection.xes"
-log = pm4py.read_xes(log_path)
+    # Specify the path to the event log in .xes format
+    log_path = "C:\\Users\\tbjac\\Documents\\uni\\bachelorarbeit\\pattern detection codes\\example logs\\4_preferentialworkselection.xes"
+    log = read_log(log_path)
 
-# Specify the path to the output file where the results get stored in .csv format, can also be left empty, then this part just gets skipped
-output_csv_path = "C:\\Users\\tbjac\\Documents\\uni\\bachelorarbeit\\pattern detection codes\\csv results\\4_preferentialworkselection_results.csv"
+    # Specify the path to the output file where the results get stored in .csv format, can also be left empty, then this part just gets skipped
+    output_csv_path = "C:\\Users\\tbjac\\Documents\\uni\\bachelorarbeit\\pattern detection codes\\csv results\\4_preferentialworkselection_results.csv"
 
-# Set a dynamic threshold for significant deviation from the average frequency of an activity being performed by a resource, the threshold gets scaled based on log size. A value of 0.5 means a deviation of 50% of the number of resources is considered significant, so if 3 resources would appear in the log, 0.5 would mean that the deviation from the average frequency of an activity being performed by a resource must be greater than 1.5 to be considered significant
-threshold_factor = 0.5
+    # Set a dynamic threshold for significant deviation from the average frequency of an activity being performed by a resource, the threshold gets scaled based on log size. A value of 0.5 means a deviation of 50% of the number of resources is considered significant, so if 3 resources would appear in the log, 0.5 would mean that the deviation from the average frequency of an activity being performed by a resource must be greater than 1.5 to be considered significant
+    threshold_factor = 0.5
 
-# Clear the content of the csv file if it exists so only the results from one run are written in the file
-if os.path.exists(output_csv_path):
-    os.remove(output_csv_path)
+    # Clear the content of the csv file if it exists so only the results from one run are written in the file
+    if os.path.exists(output_csv_path):
+        os.remove(output_csv_path)
 
-# The functions are called with the specified log and threshold
-detect_preferential_work_selection_average(log, threshold_factor)
-detect_preferential_work_selection_fcfs(log)
+    # The functions are called with the specified log and threshold
+    detect_preferential_work_selection_average(log, threshold_factor)
+    detect_preferential_work_selection_fcfs(log)
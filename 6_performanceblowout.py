@@ -1,97 +1,99 @@
-import pm4py
 import pandas as pd
 import numpy as np
+import heapq
 import os
-
-# The calculation of the time taken for each event gets defined as a function
-def calculate_time_taken(df):
-
-    # Takes a dataframe representing the event log and calculates the duration of each event within a case.
-    df['time:timestamp'] = pd.to_datetime(df['time:timestamp'])
-    df = df.sort_values(['case:concept:name', 'time:timestamp'])
-    
-    # Adds a duration column to the dataframe and set duration to NaN for "start" events
-    df['duration'] = (df['time:timestamp'] - df.groupby(['case:concept:name', 'concept:name'])['time:timestamp'].shift()).dt.total_seconds()
-    df['duration'] = df['duration'].where(df['lifecycle:transition'] != 'start', np.nan)
-    
-    # Returns the dataframe with the new "duration" attribute
-    return df
-
-
-# The algorithm for the detection of Performance Blow-out gets defined as a function
-def detect_performance_blowout(log, threshold_in, threshold_sd):
+from logcache import read_log
+from xesstream import iter_chunks
+from durations import calculate_time_taken
+from compactlog import encode_timestamps
+from runningstats import new_running_statistics, update_running_statistics, running_variance, rolling_slope
+from findings import write_findings, report
+
+# The path to the output file where the results get stored in .csv format, it is empty when the functions are imported, so the results are only written if it gets specified (like in the part at the end of the script)
+output_csv_path = ''
+
+# The release of the durations of each resource and activity in chronological order gets defined as a function, the events with a duration of each chunk are sorted by timestamp (events at the same time by case, keeping their order within the case) and put into a reorder buffer per resource and activity, as soon as a buffer holds more than reorder_window durations the earliest one is released, so only the buffers are held in memory, the remaining durations are released at the end of the log
+def iter_released_durations(log, reorder_window):
+    pending = {}
+
+    # The event log is iterated through in chunks of complete cases, which are dataframes for easier data analysis (a path to an event log in .xes format gets streamed chunk by chunk)
+    for df in iter_chunks(log):
+
+        # The duration calculation function gets called with the chunk to add a duration column, null (nan) values get skipped, the start timestamps have those
+        df = calculate_time_taken(df)
+        df = df[df['duration'].notna()]
+        timestamps = encode_timestamps(df['time:timestamp'])
+        cases = df['case:concept:name'].to_numpy(dtype=object)
+        order = np.lexsort((np.arange(len(df)), pd.factorize(cases, sort=True)[0], timestamps))
+
+        # Each duration is put into the buffer of its resource and activity, together with its timestamp, case and position, which give the chronological order
+        for position, activity, resource, duration in zip(order.tolist(), df['concept:name'].to_numpy(dtype=object)[order], df['org:resource'].to_numpy(dtype=object)[order], df['duration'].to_numpy()[order]):
+            buffer = pending.setdefault((activity, resource), [])
+            heapq.heappush(buffer, (int(timestamps[position]), cases[position], position, duration))
+            if len(buffer) > reorder_window:
+                yield activity, resource, heapq.heappop(buffer)
+
+    # The durations remaining in the buffers are released in chronological order
+    for (activity, resource), buffer in pending.items():
+        while buffer:
+            yield activity, resource, heapq.heappop(buffer)
+
+# The algorithm for the detection of Performance Blow-out gets defined as a function, the durations of each resource and activity are regarded as a stream in chronological order, only running statistics (Welford's mean and variance), the durations in the window of the rolling slope and a reorder buffer of at most reorder_window durations are kept for each of them, so the log can also be streamed chunk by chunk in bounded memory, the durations are in chronological order as long as no case in a later chunk has more than reorder_window earlier durations of the same resource and activity (without streaming they always are)
+def detect_performance_blowout(log, threshold_in, threshold_sd, window=5, reorder_window=100):
 
     # A list for the results that later get written in the output csv table is initialized, empty at first
     results = []
 
-    # The event log is converted to a dataframe for easier data analysis
-    df = pm4py.convert_to_dataframe(log)
-
-    # The duration calculation function gets called with the log converted to a dataframe to add a duration column
-    df = calculate_time_taken(df)
-    
-    # Dictionary for the time taken by each resource for each activity gets initialized, empty at first
+    # Dictionary for the running statistics of the time taken by each resource for each activity gets initialized, empty at first, the first regarded duration of each of them is stored as well
     completion_times = {}
+    first_regarded = {}
 
-    # Dictionary for booleans telling if a resource took increasingly more time for the same activity gets initialized, empty at first
-    resource_slower = {}
+    # List for the resources that took increasingly more time for the same activity gets initialized, empty at first, together with the duration at which it was detected
+    resource_slower = []
+    flagged = set()
 
-    # It is iterated through each event
-    for index, row in df.iterrows():
+    # It is iterated through the durations of each resource and activity in chronological order
+    for activity, resource, (timestamp, case, position, time_taken) in iter_released_durations(log, reorder_window):
 
-        # The activity, its assigned resource and time taken are retrieved
-        activity = row['concept:name']
-        resource = row['org:resource']
-        time_taken = row['duration']
+        # The completion_times dictionary gets a 2D entry for each activity performed by each resource, the running statistics get updated with the time taken
+        statistics = completion_times.setdefault(activity, {}).get(resource)
+        if statistics is None:
+            statistics = completion_times[activity][resource] = new_running_statistics(window)
+            first_regarded[(activity, resource)] = (timestamp, case, position)
+        update_running_statistics(statistics, time_taken)
 
-        # null (nan) values get skipped, the start timestamps have those
-        if pd.isnull(time_taken):
+        # Here it gets checked if a resource needs increasingly more time for the same activity, this can only be checked once the window is full, so a single slower execution is not enough
+        if len(statistics['recent']) < window or (activity, resource) in flagged:
             continue
 
-        # The completion_times dictionary gets a 2D entry for each activity performed by each resource
-        if activity not in completion_times:
-            completion_times[activity] = {}
-        if resource not in completion_times[activity]:
-            completion_times[activity][resource] = []
-
-        # The time taken by the regarded resource for the regarded activity gets stored in the dictionary entry
-        completion_times[activity][resource].append(time_taken)
-
-        # Here it gets checked if a resource needs increasingly more time for the same activity, this can only be checked if it was performed more than once
-        if len(completion_times[activity][resource]) > 1:
+        # First condition for Performance Blow-Out, if the time taken grew over the whole window by more than the threshold, following the rolling slope, the standard deviation of the completion times up to then is stored with it
+        if rolling_slope(statistics) * (window - 1) > threshold_in:
+            flagged.add((activity, resource))
+            resource_slower.append(((timestamp, case, position), activity, resource, np.sqrt(running_variance(statistics))))
 
-            # The tame taken for the activity previously gets retrieved
-            prev_time_taken = completion_times[activity][resource][-2]
-
-            # The time taken gets compared with the time previously taken for the same activity, flagging affected resources and activities
-            if time_taken > prev_time_taken + threshold_in:
-                resource_slower[(activity, resource)] = {'slower': True, 'flagged_time': time_taken}
-
-    # It is iterated through the dictionary containing instances where a resource got significantly slower performing the same activity
-    for key, slower in resource_slower.items():
-        activity, resource = key
-
-        # First condition for Performance Blow-Out, if the activity took significantly longer to finish than previously
-        print(f"Possible Performance Blow-out detected, resource {resource} shows increasing completion times over time for activity {activity}.")
+    # The resources that got slower are reported in the chronological order of the durations at which it was detected, so the order is the same no matter in which order the cases were streamed
+    for detected_at, activity, resource, standard_deviation in sorted(resource_slower, key=lambda slower: slower[0]):
+        report(f"Possible Performance Blow-out detected, resource {resource} shows increasing completion times over time for activity {activity}.")
 
         # The results get stored in the results list
         results_entry = {
             'Resource': resource,
             'Activity': activity,
-            'Standard Deviation': '',
+            'Standard Deviation': standard_deviation,
             'Explanation': 'The resource shows increasing completion times over time for the activity'
         }
         results.append(results_entry)
 
-    # It is iterated through the dictionary containing the completion times for each activity
-    for activity in completion_times:
+    # It is iterated through the dictionary containing the completion times for each activity, the activities and resources are regarded in the chronological order of their first duration
+    for activity in sorted(completion_times, key=lambda activity: min(first_regarded[(activity, resource)] for resource in completion_times[activity])):
+        resources = sorted(completion_times[activity], key=lambda resource: first_regarded[(activity, resource)])
 
         # Standard Deviation of mean completion times is calculated to evaluate whether resources take similar times for the same activities or not
-        standard_deviation = np.std([np.mean(times) for times in completion_times[activity].values()])
+        standard_deviation = np.std([completion_times[activity][resource]['mean'] for resource in resources])
 
         # Second condition for Performance Blow-Out, if different resources took significantly different times for the same activity
         if standard_deviation > threshold_sd:
-            print(f"Possible Performance Blow-out detected, different resources took very different times for the activity {activity}. The standard deviation is {standard_deviation}.")
+            report(f"Possible Performance Blow-out detected, different resources took very different times for the activity {activity}. The standard deviation is {standard_deviation}.")
 
             # The results get stored in the results list
             results_entry = {
@@ -103,27 +105,33 @@ def detect_performance_blowout(log, threshold_in, threshold_sd):
             results.append(results_entry)
 
     # The results are written to a csv table if an according path got specified
-    if output_csv_path:
-        results_df = pd.DataFrame(results)
-        results_df.to_csv(output_csv_path, mode='a', index=False, header=True)
-        print(f"Results appended to {output_csv_path}")
+    write_findings(results, output_csv_path, header=True)
+
+# The following part only gets executed if the script is run directly, so the functions above can also be imported without running the detection
+if __name__ == "__main__":
+
+    # Specify the path to the event log in .xes format
+    log_path = "C:\\Users\\tbjac\\Documents\\uni\\bachelorarbeit\\pattern detection codes\\example logs\\6_performanceblowout.xes"
+    log = read_log(log_path)
+
+    # Specify the path to the output file where the results get stored in .csv format, can also be left empty, then this part just gets skipped
+    output_csv_path = "C:\\Users\\tbjac\\Documents\\uni\\bachelorarbeit\\pattern detection codes\\csv results\\6_performanceblowout_results.csv"
 
-# Specify the path to the event log in .xes format
-log_path = "C:\\Users\\tbjac\\Documents\\uni\\bachelorarbeit\\pattern detection codes\\example logs\\6_performanceblowout.xes"
-log = pm4py.read_xes(log_path)
+    # Set a threshold for significant increase of completion time. The time is measured in seconds, so a threshold of 600 means 600 seconds or 10 minutes
+    threshold_in = 600 
 
-# Specify the path to the output file where the results get stored in .csv format, can also be left empty, then this part just gets skipped
-output_csv_path = "C:\\Users\\tbjac\\Documents\\uni\\bachelorarbeit\\pattern detection codes\\csv results\\6_performanceblowout_results.csv"
+    # Set a threshold for significant standard deviation. The time is measured in seconds, so a threshold of 1800 means 1800 seconds or 30 minutes
+    threshold_sd = 1800
 
-# Set a threshold for significant increase of completion time. The time is measured in seconds, so a threshold of 600 means 600 seconds or 10 minutes
-threshold_in = 600 
+    # Set the number of most recent executions of an activity by a resource the rolling slope is fitted through, the completion times have to grow by more than threshold_in over the whole window, so a single slow execution does not get flagged. A window of 2 compares each completion time with the previous one only
+    window = 5
 
-# Set a threshold for significant standard deviation. The time is measured in seconds, so a threshold of 1800 means 1800 seconds or 30 minutes
-threshold_sd = 1800
+    # Set the number of durations of each resource and activity that are held back to put them into chronological order when the log is streamed chunk by chunk, a duration is regarded in the right order as long as no later chunk brings more than this many earlier durations of the same resource and activity
+    reorder_window = 100
 
-# Clear the content of the csv file if it exists so only the results from one run are written in the file
-if os.path.exists(output_csv_path):
-    os.remove(output_csv_path)
+    # Clear the content of the csv file if it exists so only the results from one run are written in the file
+    if os.path.exists(output_csv_path):
+        os.remove(output_csv_path)
 
-# The function is called with the specified log and thresholds
-detect_performance_blowout(log, threshold_in, threshold_sd)
+    # The function is called with the specified log and thresholds
+    detect_performance_blowout(log, threshold_in, threshold_sd, window, reorder_window)
@@ -1,89 +1,115 @@
-import pm4py
-import pandas as pd
+import numpy as np
 import os
+from logcache import read_log
+from xesstream import iter_chunks
+from compactlog import compact_log
+from workcalendar import new_calendar, load_calendar, evaluate_calendar, ns_to_time
+from findings import write_findings, report, sort_by_case
 
-# The algorithm for the detection of Overwork Hiding gets defined as a function
-def detect_overwork_hiding(log):
+# The path to the output file where the results get stored in .csv format, it is empty when the functions are imported, so the results are only written if it gets specified (like in the part at the end of the script)
+output_csv_path = ''
+
+# The algorithm for the detection of Overwork Hiding gets defined as a function, the working times of the resources are given by a calendar (see workcalendar.py), which can be loaded from a table of shifts, if no calendar is given every resource works from 09:00:00 to 17:00:00 on every day
+def detect_overwork_hiding(log, calendar=None):
 
     # A list for the results that later get written in the output csv table is initialized, empty at first
     results = []
 
-    # The event log is converted to a dataframe for easier data analysis
-    df = pm4py.convert_to_dataframe(log)
-
-    # Two dictionaries are initialized for the working times of the resources, with the format 'resource':'time', empty at first
-    work_starting_times = {}
-    work_ending_times = {}
+    # The default working times for resources without specified working times are set here
+    if calendar is None:
+        calendar = new_calendar()
 
-    # The start and ending of the working times allocated to specific resources can be defined here if needed, and will be saved in the dictionaries
-    # Example: work_starting_times = {'Alice': pd.to_datetime('10:00:00').time(), 'Bob': pd.to_datetime('09:00:00').time()}
-    #          work_ending_times = {'Alice': pd.to_datetime('18:00:00').time(), 'Bob': pd.to_datetime('17:00:00').time()}
-    
+    # The event log is iterated through in chunks of complete cases, which are dataframes for easier data analysis (a path to an event log in .xes format gets streamed chunk by chunk)
+    for df in iter_chunks(log):
 
+        # The time of day of every event is compared with the working time of its resource on that day at once, on the int64 timestamps
+        times = evaluate_calendar(df, calendar)
+        outside_working_time = times['before_start'] | times['after_end'] | times['day_off']
 
-    # It is iterated through each case with all events in it
-    for case_name, case_df in df.groupby('case:concept:name'):
-        for index, row in case_df.iterrows():
+        # The events outside the working time are regarded case by case, in the order of the events within each case
+        case_codes = compact_log(df).codes['case:concept:name']
+        flagged = np.flatnonzero(outside_working_time & (case_codes >= 0))
+        flagged = flagged[np.argsort(case_codes[flagged], kind='stable')]
+        for event, case_name, resource, activity in zip(flagged.tolist(), df['case:concept:name'].to_numpy()[flagged], df['org:resource'].to_numpy()[flagged], df['concept:name'].to_numpy()[flagged]):
 
-            # The resource and timestamp associated with the regarded event are retrieved
-            resource = row['org:resource']
-            event_timestamp = pd.to_datetime(row['time:timestamp'])
-
-            # Default working times for resources without specified working times are set here
-            if resource not in work_starting_times:
-                work_starting_times[resource] = pd.to_datetime('09:00:00').time()
-            if resource not in work_ending_times:
-                work_ending_times[resource] = pd.to_datetime('17:00:00').time()
+            # The time of the event and the working time of its resource on that day are retrieved
+            event_time = ns_to_time(times['time_of_day'][event])
+            work_starting_time = ns_to_time(times['work_start'][event]) if times['work_start'][event] >= 0 else ''
+            work_ending_time = ns_to_time(times['work_end'][event]) if times['work_end'][event] >= 0 else ''
 
             # First condition for Overwork Hiding, if an event is performed before the official working time started
-            if event_timestamp.time() < work_starting_times[resource]:
-                print(f"Possible Overwork Hiding detected, resource {resource} performed activity {row['concept:name']} from Case {case_name} at {event_timestamp.time()}, before the start of allocated working time ({work_starting_times[resource]}).")
+            if times['before_start'][event]:
+                report(f"Possible Overwork Hiding detected, resource {resource} performed activity {activity} from Case {case_name} at {event_time}, before the start of allocated working time ({work_starting_time}).")
 
                 # The results get stored in the results list
                 results_entry = {
                     'Resource': resource,
-                    'Activity': row['concept:name'],
+                    'Activity': activity,
                     'Case': case_name,
-                    'Timestamp': event_timestamp.time(),
-                    'Work Starting Time': work_starting_times[resource],
-                    'Work Ending Time': work_ending_times[resource],
+                    'Timestamp': event_time,
+                    'Work Starting Time': work_starting_time,
+                    'Work Ending Time': work_ending_time,
                     'Explanation': 'The resource conducted the listed activity before the start of official working time'
                 }
                 results.append(results_entry)
 
             # Second condition for Overwork Hiding, if an event is performed after the official working time ended
-            if event_timestamp.time() > work_ending_times[resource]:
-                print(f"Possible Overwork Hiding detected, resource {resource} performed activity {row['concept:name']} from Case {case_name} at {event_timestamp.time()}, after the ending of allocated working time ({work_ending_times[resource]}).")
+            if times['after_end'][event]:
+                report(f"Possible Overwork Hiding detected, resource {resource} performed activity {activity} from Case {case_name} at {event_time}, after the ending of allocated working time ({work_ending_time}).")
 
                 # The results get stored in the results list
                 results_entry = {
                     'Detected Weasel Pattern': 'Overwork Hiding',
                     'Resource': resource,
-                    'Activity': row['concept:name'],
+                    'Activity': activity,
                     'Case': case_name,
-                    'Timestamp': event_timestamp.time(),
-                    'Work Starting Time': work_starting_times[resource],
-                    'Work Ending Time': work_ending_times[resource],
+                    'Timestamp': event_time,
+                    'Work Starting Time': work_starting_time,
+                    'Work Ending Time': work_ending_time,
                     'Explanation': 'The resource conducted the listed activity after the ending of official working time'
                 }
                 results.append(results_entry)
 
-    # The results are written to a csv table if an according path got specified
-    if output_csv_path:
-        results_df = pd.DataFrame(results)
-        results_df.to_csv(output_csv_path, mode='a', index=False, header=not os.path.exists(output_csv_path))
-        print(f"Results appended to {output_csv_path}")
+            # Third condition for Overwork Hiding, if an event is performed on a day without working time (a day off or a holiday in the calendar)
+            if times['day_off'][event]:
+                report(f"Possible Overwork Hiding detected, resource {resource} performed activity {activity} from Case {case_name} at {event_time}, on a day without allocated working time.")
+
+                # The results get stored in the results list
+                results_entry = {
+                    'Resource': resource,
+                    'Activity': activity,
+                    'Case': case_name,
+                    'Timestamp': event_time,
+                    'Work Starting Time': work_starting_time,
+                    'Work Ending Time': work_ending_time,
+                    'Explanation': 'The resource conducted the listed activity on a day without official working time'
+                }
+                results.append(results_entry)
+
+    # The results are sorted by case, so they are in the same order whether the log was regarded at once or streamed chunk by chunk, and written to a csv table if an according path got specified
+    write_findings(sort_by_case(results), output_csv_path)
+
+# The following part only gets executed if the script is run directly, so the functions above can also be imported without running the detection
+if __name__ == "__main__":
+
+    # Specify the path to the event log in .xes format
+    log_path = "C:\\Users\\tbjac\\Documents\\uni\\bachelorarbeit\\pattern detection codes\\example logs\\7_overworkhiding.xes"
+    log = read_log(log_path)
 
-# Specify the path to the event log in .xes format
-log_path = "C:\\Users\\tbjac\\Documents\\uni\\bachelorarbeit\\pattern detection codes\\example logs\\7_overworkhiding.xes"
-log = pm4py.read_xes(log_path)
+    # Specify the path to the output file where the results get stored in .csv format, can also be left empty, then this part just gets skipped
+    output_csv_path = "C:\\Users\\tbjac\\Documents\\uni\\bachelorarbeit\\pattern detection codes\\csv results\\7_overworkhiding_results.csv"
 
-# Specify the path to the output file where the results get stored in .csv format, can also be left empty, then this part just gets skipped
-output_csv_path = "C:\\Users\\tbjac\\Documents\\uni\\bachelorarbeit\\pattern detection codes\\csv results\\7_overworkhiding_results.csv"
+    # The working times of the resources can be loaded from a table of shifts in .csv format, with the columns resource, start and end, and optionally weekday (empty for every day) and timezone, resources that are not in the table work from 09:00:00 to 17:00:00 on every day
+    # Example table: resource,weekday,start,end
+    #                Alice,,10:00:00,18:00:00
+    #                Bob,Mon,09:00:00,17:00:00
+    # Holidays (on which nobody works) and the timezone of the working times can be given as well, e.g. load_calendar(calendar_path, timezone='Europe/Berlin', holidays=['2023-12-25'])
+    calendar_path = ""
+    calendar = load_calendar(calendar_path) if calendar_path else None
 
-# Clear the content of the csv file if it exists so only the results from one run are written in the file
-if os.path.exists(output_csv_path):
-    os.remove(output_csv_path)
+    # Clear the content of the csv file if it exists so only the results from one run are written in the file
+    if os.path.exists(output_csv_path):
+        os.remove(output_csv_path)
 
-# The function is called with the specified log
-detect_overwork_hiding(log)
+    # The function is called with the specified log and calendar
+    detect_overwork_hiding(log, calendar)
@@ -1,21 +1,43 @@
-import pm4py
 import pandas as pd
 import numpy as np
 import os
-
-# The calculation of the time taken for each event gets defined as a function
-def calculate_time_taken(df):
-
-    # Takes a dataframe representing the event log and calculates the duration of each event within a case.
-    df['time:timestamp'] = pd.to_datetime(df['time:timestamp'])
-    df = df.sort_values(['case:concept:name', 'time:timestamp'])
-    
-    # Adds a duration column to the dataframe and set duration to NaN for "start" events
-    df['duration'] = (df['time:timestamp'] - df.groupby(['case:concept:name', 'concept:name'])['time:timestamp'].shift()).dt.total_seconds()
-    df['duration'] = df['duration'].where(df['lifecycle:transition'] != 'start', np.nan)
-    
-    # Returns the dataframe with the new "duration" attribute
-    return df
+from logcache import read_log, to_dataframe
+from xesstream import iter_chunks
+from compactlog import NAT, compact_log
+from activitycube import activity_cube
+from workcalendar import new_calendar, local_times
+from findings import write_findings, report, sort_by_case
+
+# The path to the output file where the results get stored in .csv format, it is empty when the functions are imported, so the results are only written if it gets specified (like in the part at the end of the script)
+output_csv_path = ''
+
+# The calculation of the average time each resource needs for each activity gets defined as a function, it is shared by the first two conditions of Idling
+def calculate_average_times(df):
+
+    # The time taken by each resource for each activity and the count of how often each activity was performed by each resource (only events with a duration, "start" events don't have one) are retrieved from the resource x activity cube of the log, which is shared with other detection functions
+    cube = activity_cube(df)
+    completion_times = cube['duration_sums']
+    activity_count = cube['duration_counts']
+    performed = activity_count > 0
+
+    # The average time each resource needs for each activity is calculated
+    average_times = np.divide(completion_times, activity_count, out=np.zeros(completion_times.shape), where=performed)
+
+    # The activities are regarded in the order they first appear among the events with a duration, and the resources of each activity in the order they first performed it, as a rank for each combination of resource and activity
+    first_duration = np.where(performed, cube['first_duration'], len(df))
+    activity_order = np.argsort(first_duration.min(axis=0), kind='stable')
+    activity_order = activity_order[first_duration.min(axis=0)[activity_order] < len(df)]
+    resource_order = np.argsort(first_duration, axis=0, kind='stable')
+
+    # Returns the cube, the average times, the mask of the performed combinations and the order of the activities and resources
+    return cube, average_times, performed, activity_order, resource_order
+
+# The retrieval of the flagged combinations of resource and activity gets defined as a function, they are returned in the order the activities and the resources of each activity are regarded in
+def ordered_combinations(flagged, activity_order, resource_order):
+    flagged_in_order = np.take_along_axis(flagged, resource_order, axis=0)[:, activity_order]
+    resource_ranks, activity_ranks = np.nonzero(flagged_in_order.T)[::-1]
+    activity_codes = activity_order[activity_ranks]
+    return list(zip(resource_order[resource_ranks, activity_codes].tolist(), activity_codes.tolist()))
 
 # The algorithm for the detection of the first condition of Idling, resources taking more time to perform certain activities than other resources need for the same activities,  gets defined as a function
 def detect_idling_resource(log, threshold):
@@ -24,78 +46,35 @@ def detect_idling_resource(log, threshold):
     results = []
 
     # The event log is converted to a dataframe for easier data analysis
-    df = pm4py.convert_to_dataframe(log)
-    
-    # Takes a dataframe representing the event log and calculates the duration of each event within a case.
-    df['time:timestamp'] = pd.to_datetime(df['time:timestamp'])
-    df = df.sort_values(['case:concept:name', 'time:timestamp'])
-    
-    # The duration calculation function gets called with the log converted to a dataframe to add a duration column
-    df = calculate_time_taken(df)
-
-    # Two dictionaries are initialized for the time taken by each resource for each activity and for the count of how often each activity was performed by each resource, empty at first
-    completion_times = {}
-    activity_count = {}
-
-    # It is iterated through each event
-    for index, row in df.iterrows():
-
-        # The activity, its assigned resource and time taken are retrieved
-        activity = row['concept:name']
-        resource = row['org:resource']
-        time_taken = row['duration']
-
-        # null (nan) values get skipped, the start timestamps have those
-        if pd.isnull(time_taken):
-            continue
-
-        # The two dictionaries get 2D entries for each activity performed by each resource
-        if activity not in completion_times:
-            completion_times[activity] = {}
-            activity_count[activity] = {}
-        if resource not in completion_times[activity]:
-            completion_times[activity][resource] = 0
-            activity_count[activity][resource] = 0
-
-        # The time taken by the regarded resource for the regarded activity gets stored in the dictionary entry
-        completion_times[activity][resource] += time_taken
-
-        # The count of how often the regarded activity was performed by the regarded resource gets incremented
-        activity_count[activity][resource] += 1
-
-    # Completion times for all resources combined get stored for each activity
-    total_completion_times = {activity: sum(completion_times[activity].values()) for activity in completion_times}
-
-    # It is iterated through each activity and resource
-    for activity in completion_times:
-        for resource in completion_times[activity]:
-
-            # The average time the regarded resource needs for the regarded activity gets calculated and stored
-            average_time = completion_times[activity][resource] / activity_count[activity][resource]
-            
-            # Checks if the regarded activity has a recorded total completion time
-            if activity in total_completion_times:
-
-                # First condition for Idling, if the resource needs significantly more time on average for a certain activity than other resources need for the same activities
-                if average_time - total_completion_times[activity] / sum(activity_count[activity].values()) > threshold:
-                    print(f"Possible Idling detected, resource {resource} takes significantly more time ({average_time}) for activity {activity} compared to the average time of all resources ({total_completion_times[activity] / sum(activity_count[activity].values())}) for this activity.")
-
-                    # The results get stored in the results list
-                    results_entry = {
-                        'Resource': resource,
-                        'Activity': activity,
-                        'Case': '',
-                        'Resource Average Time': average_time,
-                        'Total Average Time': total_completion_times[activity] / sum(activity_count[activity].values()),
-                        'Explanation': 'The resource takes significantly more time for the activity compared to the average time of all resources for this activity'
-                    }
-                    results.append(results_entry)
+    df = to_dataframe(log)
+
+    # The average time each resource needs for each activity is retrieved, together with the order the activities and resources are regarded in
+    cube, average_times, performed, activity_order, resource_order = calculate_average_times(df)
+
+    # Completion times and counts for all resources combined get calculated for each activity, the average time of all resources is the total completion time divided by the total count, the completion times are added up in the order the resources are regarded in
+    total_completion_times = np.cumsum(np.take_along_axis(cube['duration_sums'], resource_order, axis=0), axis=0)[-1]
+    total_average_times = np.divide(total_completion_times, cube['duration_counts'].sum(axis=0), out=np.zeros(total_completion_times.shape), where=performed.any(axis=0))
+
+    # First condition for Idling, if the resource needs significantly more time on average for a certain activity than other resources need for the same activities, all combinations are compared at once and only the flagged ones are iterated through
+    flagged = performed & (average_times - total_average_times[None, :] > threshold)
+    for resource_code, activity_code in ordered_combinations(flagged, activity_order, resource_order):
+        activity, resource = cube['activities'][activity_code], cube['resources'][resource_code]
+        average_time, total_average_time = average_times[resource_code, activity_code].item(), total_average_times[activity_code].item()
+        report(f"Possible Idling detected, resource {resource} takes significantly more time ({average_time}) for activity {activity} compared to the average time of all resources ({total_average_time}) for this activity.")
+
+        # The results get stored in the results list
+        results_entry = {
+            'Resource': resource,
+            'Activity': activity,
+            'Case': '',
+            'Resource Average Time': average_time,
+            'Total Average Time': total_average_time,
+            'Explanation': 'The resource takes significantly more time for the activity compared to the average time of all resources for this activity'
+        }
+        results.append(results_entry)
 
     # The results are written to a csv table if an according path got specified
-    if output_csv_path:
-        results_df = pd.DataFrame(results)
-        results_df.to_csv(output_csv_path, mode='a', index=False, header=not os.path.exists(output_csv_path))
-        print(f"Results appended to {output_csv_path}")
+    write_findings(results, output_csv_path)
 
 
 # The algorithm for the detection of the second condition of Idling, resources taking more time to perform certain activities than they need for other activities,  gets defined as a function
@@ -105,175 +84,145 @@ def detect_idling_activity(log, threshold):
     results = []
 
     # The event log is converted to a dataframe for easier data analysis
-    df = pm4py.convert_to_dataframe(log)
-    
-    # Takes a dataframe representing the event log and calculates the duration of each event within a case.
-    df['time:timestamp'] = pd.to_datetime(df['time:timestamp'])
-    df = df.sort_values(['case:concept:name', 'time:timestamp'])
-    
-    # The duration calculation function gets called with the log converted to a dataframe to add a duration column
-    df = calculate_time_taken(df)
-
-    # Two dictionaries are initialized for the time taken by each resource for each activity and for the count of how often each activity was performed by each resource, empty at first
-    completion_times = {}
-    activity_count = {}
-
-    # It is iterated through each event
-    for index, row in df.iterrows():
-
-        # The activity, its assigned resource and time taken are retrieved
-        activity = row['concept:name']
-        resource = row['org:resource']
-        time_taken = row['duration']
-
-        # During debugging, it turned out that some time values ​​were null, those get skipped
-        if pd.isnull(time_taken):
-            continue
-
-        # The two dictionaries get 2D entries for each activity performed by each resource
-        if activity not in completion_times:
-            completion_times[activity] = {}
-            activity_count[activity] = {}
-        if resource not in completion_times[activity]:
-            completion_times[activity][resource] = 0
-            activity_count[activity][resource] = 0
-
-        # The time taken by the regarded resource for the regarded activity gets stored in the dictionary entry
-        completion_times[activity][resource] += time_taken
-
-        # The count of how often the regarded activity was performed by the regarded resource gets incremented
-        activity_count[activity][resource] += 1
-
-    # A dictionary is initialized for the average completion times of each resource, empty at first
-    resource_average_times = {}
-
-    # It is iterated through the dictionary containing the completion times for each resource and activity
-    for activity in completion_times:
-        for resource in completion_times[activity]:
-
-            # The overall average completion time for each activity is calulcated and stored
-            activity_average_times = completion_times[activity][resource] / activity_count[activity][resource]
-        
-            # The overall average completion time for each resource is calculated and stored
-            if resource not in resource_average_times:
-                resource_average_times[resource] = []
-            resource_average_times[resource].append(activity_average_times)
-
-    # The average of average times is calculated for each resource
-    average_of_average_times = {}
-    for resource, times in resource_average_times.items():
-        average_of_average_times[resource] = sum(times) / len(times)
-
-    # It is iterated through the dictionary containing the completion times for each resource and activity
-    for activity in completion_times:
-        for resource in completion_times[activity]:
-
-            # Check if the resource is present in average_of_average_times to make sure the resource actually performed the activity
-            if resource in average_of_average_times:
-                # The average times of the resource for the regarded activity and for all activities overall are retrieved
-                average_time = completion_times[activity][resource] / activity_count[activity][resource]
-                avg_of_avg_time = average_of_average_times[resource]
-
-                # Second condition for Idling, if the resource needs significantly more time on average for a certain activity than the same resource needs for the average activity
-                if average_time - avg_of_avg_time > threshold:
-                    print(f"Possible Idling detected, resource {resource} takes significantly more time ({average_time}) for activity {activity} compared to its average time for all activities combined ({avg_of_avg_time}).")
-
-                    # The results get stored in the results list
-                    results_entry = {
-                        'Resource': resource,
-                        'Activity': activity,
-                        'Case': '',
-                        'Resource Average Time': average_time,
-                        'Total Average Time': avg_of_avg_time,
-                        'Explanation': 'The resource takes significantly more time for the activity compared to its average time of all activities combined'
-                    }
-                    results.append(results_entry)
+    df = to_dataframe(log)
+
+    # The average time each resource needs for each activity is retrieved, together with the order the activities and resources are regarded in
+    cube, average_times, performed, activity_order, resource_order = calculate_average_times(df)
+
+    # The average of the average times of all activities a resource performed is calculated for each resource, the activities are added up in the order they are regarded in
+    average_of_average_times = np.cumsum(average_times[:, activity_order], axis=1)[:, -1] / np.maximum(performed.sum(axis=1), 1) if len(activity_order) else np.zeros(len(average_times))
+
+    # Second condition for Idling, if the resource needs significantly more time on average for a certain activity than the same resource needs for the average activity, all combinations are compared at once and only the flagged ones are iterated through
+    flagged = performed & (average_times - average_of_average_times[:, None] > threshold)
+    for resource_code, activity_code in ordered_combinations(flagged, activity_order, resource_order):
+        activity, resource = cube['activities'][activity_code], cube['resources'][resource_code]
+
+        # The average times of the resource for the regarded activity and for all activities overall are retrieved
+        average_time = average_times[resource_code, activity_code].item()
+        avg_of_avg_time = average_of_average_times[resource_code].item()
+        report(f"Possible Idling detected, resource {resource} takes significantly more time ({average_time}) for activity {activity} compared to its average time for all activities combined ({avg_of_avg_time}).")
+
+        # The results get stored in the results list
+        results_entry = {
+            'Resource': resource,
+            'Activity': activity,
+            'Case': '',
+            'Resource Average Time': average_time,
+            'Total Average Time': avg_of_avg_time,
+            'Explanation': 'The resource takes significantly more time for the activity compared to its average time of all activities combined'
+        }
+        results.append(results_entry)
 
     # The results are written to a csv table if an according path got specified
-    if output_csv_path:
-        results_df = pd.DataFrame(results)
-        results_df.to_csv(output_csv_path, mode='a', index=False, header=not os.path.exists(output_csv_path))
-        print(f"Results appended to {output_csv_path}")
-
-
-# The algorithm for the detection of the third condition of Idling, resources taking long breaks,  gets defined as a function
-def detect_idling_break(log, threshold):
+    write_findings(results, output_csv_path)
+
+
+# The search for breaks gets defined as a function, it returns the completion event, the following start event, the event whose activity gets reported and the length of the break in seconds for each break longer than the threshold, ordered like the start events on the timeline
+def find_breaks(df, threshold, timeline='case'):
+    compact = compact_log(df)
+    case_codes = compact.codes['case:concept:name']
+    resource_codes = compact.codes['org:resource']
+    timestamps = compact.timestamps
+    is_complete = compact.mask('lifecycle:transition', 'complete')
+    is_start = compact.mask('lifecycle:transition', 'start')
+    by_case = timeline == 'case'
+
+    # The events with a timestamp (and a case, if the timeline is per case) are placed on the timeline, sorted by case (if the timeline is per case) and timestamp, events with the same timestamp keep their order
+    events = np.flatnonzero((timestamps != NAT) & ((case_codes >= 0) | (not by_case)))
+    events = events[np.lexsort((timestamps[events], case_codes[events])) if by_case else np.argsort(timestamps[events], kind='stable')]
+
+    # Within the timeline, the events of each resource (in each case, if the timeline is per case) are placed next to each other, and the last completion before each event of the same resource is found with a running maximum that is reset for each resource
+    grouped = np.lexsort((np.arange(len(events)), resource_codes[events], case_codes[events] if by_case else np.zeros(len(events), dtype=np.int32)))
+    grouped_events = events[grouped]
+    new_group = np.ones(len(grouped), dtype=bool)
+    new_group[1:] = (resource_codes[grouped_events][1:] != resource_codes[grouped_events][:-1]) | (by_case & (case_codes[grouped_events][1:] != case_codes[grouped_events][:-1]))
+    group_start = np.maximum.accumulate(np.where(new_group, np.arange(len(grouped)), 0))
+    last_complete = np.maximum.accumulate(np.where(is_complete[grouped_events], np.arange(len(grouped)), -1))
+    candidates = np.flatnonzero(is_start[grouped_events] & (last_complete >= group_start))
+
+    # Only breaks within the same day are regarded, the day of each event is calculated in the timezone of the log
+    days = local_times(df, new_calendar())['days']
+    complete_events, start_events = grouped_events[last_complete[candidates]], grouped_events[candidates]
+    break_seconds = (timestamps[start_events] - timestamps[complete_events]) / 1e9
+    flagged = (days[complete_events] == days[start_events]) & (break_seconds > threshold)
+    flagged = flagged.nonzero()[0][np.argsort(grouped[candidates][flagged], kind='stable')]
+
+    # On the timeline per case, the reported activity is the one of the first event in the case registered at the time of the completion, on the timeline per resource it is the one of the completion event itself
+    reported_events = complete_events
+    if by_case:
+        same_time = np.zeros(len(events), dtype=bool)
+        same_time[1:] = (case_codes[events][1:] == case_codes[events][:-1]) & (timestamps[events][1:] == timestamps[events][:-1])
+        first_at_same_time = events[np.maximum.accumulate(np.where(same_time, 0, np.arange(len(events))))]
+        reported_events = first_at_same_time[grouped[last_complete[candidates]]]
+    return list(zip(complete_events[flagged].tolist(), start_events[flagged].tolist(), reported_events[flagged].tolist(), break_seconds[flagged].tolist()))
+
+# The algorithm for the detection of the third condition of Idling, resources taking long breaks,  gets defined as a function, the breaks are measured between a completion and the following start of the same resource, either within each case (timeline 'case') or on the timeline of all events of the resource across cases (timeline 'resource')
+def detect_idling_break(log, threshold, timeline='case'):
 
     # A list for the results that later get written in the output csv table is initialized, empty at first
     results = []
 
-    # The event log is converted to a dataframe for easier data analysis
-    df = pm4py.convert_to_dataframe(log)
-
-    # A dictionary is initialized for the last registered completion timestamp of a resource, empty at first
-    last_complete_timestamp = {}
-    
-    # It is iterated through each case
-    for case_name, case_df in df.groupby('case:concept:name'):
-
-        # Within each case, the events get sorted based on their timestamp
-        case_df = case_df.sort_values(by='time:timestamp')
-        last_complete_timestamp = {}
-
-        # It is iterated through each event in the regarded case
-        for index, row in case_df.iterrows():
-
-            # The resource and timestamp associated with the regarded event are retrieved
-            resource = row['org:resource']
-            event_timestamp = pd.to_datetime(row['time:timestamp'])
-
-            # Stores the last registered completion timestamp
-            if row['lifecycle:transition'] == 'complete':
-                last_complete_timestamp[resource] = event_timestamp
-
-            # Checks if the regarded timestamp marks the start of an activity, and if the regarded resource registered a completion timestamp before. If so, the time difference between those is calculated
-            elif row['lifecycle:transition'] == 'start' and resource in last_complete_timestamp:
-                if event_timestamp.date() == last_complete_timestamp[resource].date():
-                    time_difference = (event_timestamp - last_complete_timestamp[resource]).total_seconds()
-
-                    # Third condition for Idling, if a resource appears to have taken a disproportionately long break during working time
-                    if time_difference > threshold:
-                        print(f"Possible Idling detected, resource {resource} idled for {time_difference} seconds between activities {case_df.loc[case_df['time:timestamp'] == last_complete_timestamp[resource]]['concept:name'].values[0]} (registered at {last_complete_timestamp[resource]}) and {row['concept:name']} (registered at {event_timestamp}) in Case {case_name}.")
-
-                        # The results get stored in the results list
-                        results_entry = {
-                            'Resource': resource,
-                            'Activity': case_df.loc[case_df['time:timestamp'] == last_complete_timestamp[resource]]['concept:name'].values[0],
-                            'Case': case_name,
-                            'Resource Average Time': '',
-                            'Total Average Time': '',
-                            'Explanation': 'The resource took a significantly long break after the activity'
-                        }
-                        results.append(results_entry)
+    # The timeline per resource spans all cases, so it needs the whole log at once and can't be streamed chunk by chunk, the memory would not stay bounded
+    if timeline == 'resource' and not (isinstance(log, pd.DataFrame) or hasattr(log, 'attributes')):
+        raise ValueError("The breaks on the timeline per resource can only be detected on the whole log, not on a log that gets streamed chunk by chunk, use timeline 'case' instead")
 
-    # The results are written to a csv table if an according path got specified
-    if output_csv_path:
-        results_df = pd.DataFrame(results)
-        results_df.to_csv(output_csv_path, mode='a', index=False, header=not os.path.exists(output_csv_path))
-        print(f"Results appended to {output_csv_path}")
+    # The event log is iterated through in chunks of complete cases, which are dataframes for easier data analysis (a path to an event log in .xes format gets streamed chunk by chunk)
+    for df in iter_chunks(log):
+
+        # The breaks longer than the threshold are found for all resources at once
+        for complete_event, start_event, reported_event, time_difference in find_breaks(df, threshold, timeline):
+            resource = df['org:resource'].iloc[start_event]
+            activity, case_name = df['concept:name'].iloc[reported_event], df['case:concept:name'].iloc[complete_event]
+            complete_timestamp, start_timestamp = df['time:timestamp'].iloc[complete_event], df['time:timestamp'].iloc[start_event]
+
+            # Third condition for Idling, if a resource appears to have taken a disproportionately long break during working time
+            if timeline == 'resource':
+                report(f"Possible Idling detected, resource {resource} idled for {time_difference} seconds between activities {activity} (registered at {complete_timestamp}) in Case {case_name} and {df['concept:name'].iloc[start_event]} (registered at {start_timestamp}) in Case {df['case:concept:name'].iloc[start_event]}.")
+            else:
+                report(f"Possible Idling detected, resource {resource} idled for {time_difference} seconds between activities {activity} (registered at {complete_timestamp}) and {df['concept:name'].iloc[start_event]} (registered at {start_timestamp}) in Case {case_name}.")
+
+            # The results get stored in the results list
+            results_entry = {
+                'Resource': resource,
+                'Activity': activity,
+                'Case': case_name,
+                'Resource Average Time': '',
+                'Total Average Time': '',
+                'Explanation': 'The resource took a significantly long break after the activity'
+            }
+            results.append(results_entry)
+
+    # The breaks within each case are sorted by case, so they are in the same order whether the log was regarded at once or streamed chunk by chunk, and the results are written to a csv table if an according path got specified
+    write_findings(sort_by_case(results) if timeline == 'case' else results, output_csv_path)
+
+
+# The following part only gets executed if the script is run directly, so the functions above can also be imported without running the detection
+if __name__ == "__main__":
 
+    # Specify the path to the event log in .xes format
+    log_path = "C:\\Users\\tbjac\\Documents\\uni\\bachelorarbeit\\pattern detection codes\\example logs\\9_idling.xes"
+    log = read_log(log_path)
 
-# Specify the path to the event log in .xes format
-log_path = "C:\\Users\\tbjac\\Documents\\uni\\bachelorarbeit\\pattern detection codes\\example logs\\9_idling.xes"
-log = pm4py.read_xes(log_path)
+    # Specify the path to the output file where the results get stored in .csv format, can also be left empty, then this part just gets skipped
+    output_csv_path = "C:\\Users\\tbjac\\Documents\\uni\\bachelorarbeit\\pattern detection codes\\csv results\\9_idling_results.csv"
 
-# Specify the path to the output file where the results get stored in .csv format, can also be left empty, then this part just gets skipped
-output_csv_path = "C:\\Users\\tbjac\\Documents\\uni\\bachelorarbeit\\pattern detection codes\\csv results\\9_idling_results.csv"
+    # Set a threshold for significant deviation of the completion time for a certain resource compared with other resources performing the same activities. The time is measured in seconds, so a threshold of 300 means 300 seconds or 5 minutes
+    threshold_resource = 300
 
-# Set a threshold for significant deviation of the completion time for a certain resource compared with other resources performing the same activities. The time is measured in seconds, so a threshold of 300 means 300 seconds or 5 minutes
-threshold_resource = 300
+    # Set a threshold for significant deviation of the completion time for a certain activity compared with other activities performed by the same resource. The time is measured in seconds, so a threshold of 600 means 600 seconds or 10 minutes
+    threshold_activity = 600
 
-# Set a threshold for significant deviation of the completion time for a certain activity compared with other activities performed by the same resource. The time is measured in seconds, so a threshold of 600 means 600 seconds or 10 minutes
-threshold_activity = 600
+    # Set a threshold for significantly long breaks, gets used in the function for the third condition. The time is measured in seconds, so a threshold of 14400 means 14400 seconds or 4 hours
+    threshold_break = 14400
 
-# Set a threshold for significantly long breaks, gets used in the function for the third condition. The time is measured in seconds, so a threshold of 14400 means 14400 seconds or 4 hours
-threshold_break = 14400
+    # Set the timeline the breaks are measured on, 'case' only regards the events of a resource within the same case, 'resource' regards all events of a resource across cases, so breaks where the resource moves from one case to another are found as well
+    timeline_break = 'case'
 
-# Clear the content of the csv file if it exists so only the results from one run are written in the file
-if os.path.exists(output_csv_path):
-    os.remove(output_csv_path)
+    # Clear the content of the csv file if it exists so only the results from one run are written in the file
+    if os.path.exists(output_csv_path):
+        os.remove(output_csv_path)
 
-# The functions are called with the specified log and thresholds
-detect_idling_resource(log, threshold_resource)
-detect_idling_activity(log, threshold_activity)
-detect_idling_break(log, threshold_break)
+    # The functions are called with the specified log and thresholds
+    detect_idling_resource(log, threshold_resource)
+    detect_idling_activity(log, threshold_activity)
+    detect_idling_break(log, threshold_break, timeline_break)
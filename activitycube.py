@@ -0,0 +1,48 @@
+import numpy as np
+from compactlog import NAT, compact_log, memoize
+from durations import calculate_durations
+
+# The building of the resource x activity cube gets defined as a function, it holds the counts and duration sums for each combination of resource and activity, built with bincount over the integer codes of the compact representation of the log
+def build_activity_cube(df):
+
+    # The codes of the resources and activities are retrieved, missing values get their own code after the codes of all values
+    compact = compact_log(df)
+    resource_lookup = compact.lookup['org:resource']
+    activity_lookup = compact.lookup['concept:name']
+    num_resources, num_activities = len(resource_lookup) + 1, len(activity_lookup) + 1
+    resource_codes = np.where(compact.codes['org:resource'] >= 0, compact.codes['org:resource'], num_resources - 1)
+    activity_codes = np.where(compact.codes['concept:name'] >= 0, compact.codes['concept:name'], num_activities - 1)
+    cells = resource_codes.astype(np.int64) * num_activities + activity_codes
+    shape = (num_resources, num_activities)
+
+    # The number of events of each resource for each activity and the position of the first of these events in the log
+    counts = np.bincount(cells, minlength=num_resources * num_activities).reshape(shape)
+    first_event = np.full(num_resources * num_activities, len(df))
+    unique_cells, first_positions = np.unique(cells, return_index=True)
+    first_event[unique_cells] = first_positions
+
+    # The durations in seconds are added up in the order of the events sorted by case and timestamp (the order of calculate_time_taken), only events with a duration are regarded
+    order, duration_ns = calculate_durations(df)
+    order = order[duration_ns[order] != NAT]
+    durations = duration_ns[order] / 1e9
+    duration_cells = cells[order]
+    duration_counts = np.bincount(duration_cells, minlength=num_resources * num_activities).reshape(shape)
+    duration_sums = np.bincount(duration_cells, weights=durations, minlength=num_resources * num_activities).reshape(shape)
+    first_duration = np.full(num_resources * num_activities, len(df))
+    unique_cells, first_positions = np.unique(duration_cells, return_index=True)
+    first_duration[unique_cells] = first_positions
+
+    # Returns the cube as a dictionary, the resources and activities hold the values belonging to the codes of the rows and columns
+    return {
+        'resources': np.append(resource_lookup.to_numpy(dtype=object), np.nan),
+        'activities': np.append(activity_lookup.to_numpy(dtype=object), np.nan),
+        'counts': counts,
+        'first_event': first_event.reshape(shape),
+        'duration_counts': duration_counts,
+        'duration_sums': duration_sums,
+        'first_duration': first_duration.reshape(shape)
+    }
+
+# The resource x activity cube of a dataframe gets defined as a function, it is only built once per dataframe, so all detection functions called with the same log share it
+def activity_cube(df):
+    return memoize(df, 'activity_cube', build_activity_cube)
@@ -0,0 +1,126 @@
+import pandas as pd
+import numpy as np
+import argparse
+import contextlib
+import importlib
+import os
+import time
+import tracemalloc
+from loggenerator import generate_log
+from runall import detectors, default_parameters, run_detector
+
+# The default sizes of the generated logs in number of events
+default_sizes = [1000, 10000, 100000]
+
+# The measurement of a single detection function on one log gets defined as a function, the printed findings are discarded so only the detection itself is measured
+def measure_detector(name, module, df, track_memory=True):
+
+    # Each detection function gets its own copy of the log and its own dictionary for shared intermediate results, the values memoized for the log (e.g. its compact representation) belong to the original dataframe and are not found for the copy, so every detection function is measured including the helpers it needs
+    df = df.copy()
+    shared = {'log_path': None, 'streaming': False, 'traces_per_chunk': 1000, 'processes': 1}
+    if track_memory:
+        tracemalloc.start()
+    start_time = time.perf_counter()
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        run_detector(name, module, df, default_parameters[name], shared)
+    seconds = time.perf_counter() - start_time
+    peak_memory = None
+    if track_memory:
+        peak_memory = tracemalloc.get_traced_memory()[1] / 2**20
+        tracemalloc.stop()
+    return seconds, peak_memory
+
+# The fitting of the complexity of a detection function gets defined as a function, the runtime is assumed to grow with events ** exponent, which is a straight line in a log-log plot
+def fit_complexity(events, seconds):
+    events, seconds = np.asarray(events, dtype=float), np.asarray(seconds, dtype=float)
+    if len(events) < 2:
+        return np.nan, np.nan
+    exponent, intercept = np.polyfit(np.log(events), np.log(np.maximum(seconds, 1e-6)), 1)
+    return exponent, np.exp(intercept)
+
+# The benchmark of the selected detection functions on synthetic logs of growing size gets defined as a function, detection functions that took longer than the time limit are skipped for the larger logs
+def run_benchmark(sizes=None, selected_detectors=None, events_per_case=20, num_resources=10, num_activities=8, weasel_rate=0.1, time_limit=60, track_memory=True, seed=0):
+
+    # If no sizes or detectors got selected, the default sizes and all detectors are used
+    if sizes is None:
+        sizes = default_sizes
+    if selected_detectors is None:
+        selected_detectors = list(detectors)
+
+    # The scripts are imported without an output csv path, so the findings don't get written anywhere
+    modules = {}
+    for name in selected_detectors:
+        module = importlib.import_module(detectors[name])
+        module.output_csv_path = ''
+        modules[name] = module
+
+    # A list for the measurements and a set for the detection functions that exceeded the time limit are initialized, empty at first
+    measurements = []
+    too_slow = set()
+
+    # It is iterated through each log size
+    for size in sorted(sizes):
+        df = generate_log(max(size // events_per_case, 1), events_per_case, num_resources, num_activities, weasel_rate, seed=seed)
+        print(f"Generated log with {len(df)} events in {df['case:concept:name'].nunique()} cases")
+
+        # It is iterated through each detection function
+        for name in selected_detectors:
+            if name in too_slow:
+                continue
+            seconds, peak_memory = measure_detector(name, modules[name], df, track_memory)
+            if seconds > time_limit:
+                too_slow.add(name)
+
+            # The measurement gets printed and stored in the measurements list
+            memory_text = f", peak memory {peak_memory:.1f} MB" if peak_memory is not None else ""
+            print(f"{name}: {seconds:.3f} seconds, {len(df) / seconds:.0f} events/s{memory_text}")
+            measurements.append({
+                'Detector': name,
+                'Events': len(df),
+                'Cases': df['case:concept:name'].nunique(),
+                'Seconds': seconds,
+                'Events per second': len(df) / seconds,
+                'Peak memory (MB)': peak_memory
+            })
+
+    # The complexity of each detection function is fitted from its measurements
+    measurements = pd.DataFrame(measurements)
+    complexity = []
+    for name in selected_detectors:
+        detector_measurements = measurements[measurements['Detector'] == name]
+        exponent, factor = fit_complexity(detector_measurements['Events'], detector_measurements['Seconds'])
+        print(f"{name}: runtime grows with events ** {exponent:.2f}")
+        complexity.append({
+            'Detector': name,
+            'Exponent': exponent,
+            'Seconds per events ** exponent': factor,
+            'Exceeded time limit': name in too_slow
+        })
+
+    # Returns the measurements and the fitted complexity of each detection function
+    return measurements, pd.DataFrame(complexity)
+
+
+if __name__ == "__main__":
+
+    # The log sizes, the detectors and the directory for the csv results can be specified on the command line
+    parser = argparse.ArgumentParser(description="Measures the runtime, throughput and peak memory of the detectors on synthetic event logs of growing size")
+    parser.add_argument('--sizes', type=int, nargs='+', default=default_sizes, help="sizes of the generated logs in number of events, e.g. 1000 10000 100000 1000000 10000000")
+    parser.add_argument('--detectors', nargs='+', choices=list(detectors), help="detection functions to measure, all of them are measured if left empty")
+    parser.add_argument('--events-per-case', type=int, default=20, help="average number of events per case")
+    parser.add_argument('--resources', type=int, default=10, help="number of resources")
+    parser.add_argument('--activities', type=int, default=8, help="number of activities")
+    parser.add_argument('--weasel-rate', type=float, default=0.1, help="share of cases with an injected weasel pattern")
+    parser.add_argument('--time-limit', type=float, default=60, help="detection functions that take longer than this many seconds are skipped for the larger logs")
+    parser.add_argument('--no-memory', action='store_true', help="don't track the peak memory, which slows down the detection functions")
+    parser.add_argument('--seed', type=int, default=0, help="seed of the random number generator")
+    parser.add_argument('--output-dir', default='', help="directory the measurements get written to in .csv format, can also be left empty, then this part just gets skipped")
+    args = parser.parse_args()
+
+    measurements, complexity = run_benchmark(args.sizes, args.detectors, args.events_per_case, args.resources, args.activities, args.weasel_rate, args.time_limit, not args.no_memory, args.seed)
+
+    # The measurements and the fitted complexity are written in the output csv files
+    if args.output_dir:
+        os.makedirs(args.output_dir, exist_ok=True)
+        measurements.to_csv(os.path.join(args.output_dir, 'benchmark_results.csv'), index=False)
+        complexity.to_csv(os.path.join(args.output_dir, 'benchmark_complexity.csv'), index=False)
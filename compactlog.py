@@ -0,0 +1,93 @@
+import pandas as pd
+import numpy as np
+import weakref
+
+# The value numpy uses for NaT in int64 arrays, timestamps that are missing get this value
+NAT = np.iinfo(np.int64).min
+
+# The columns that get dictionary-encoded as int32 codes in the compact representation of a log
+encoded_columns = ['case:concept:name', 'concept:name', 'org:resource', 'lifecycle:transition']
+
+# A dictionary for the values that were already calculated for a dataframe, with the id of the dataframe and the name of the value as key, empty at first
+memoized_values = {}
+
+# The data behind a column gets defined as a function, it is the same object as long as the column is not replaced (e.g. by assigning new values to it), for columns stored in numpy arrays it is the array the values are a view of
+def column_data(column):
+    values = column.array
+    if hasattr(values, 'asi8'):
+        values = values.asi8
+    elif isinstance(values, pd.arrays.NumpyExtensionArray):
+        values = values.to_numpy()
+    else:
+        return values
+    while isinstance(values.base, np.ndarray):
+        values = values.base
+    return values
+
+# The identity of the columns the memoized values are calculated from gets defined as a function, it holds the data behind each of these columns, so it changes as soon as one of them gets replaced, the data is kept alive by the memoized value, so its id can't be reused for another column in the meantime
+def columns_identity(df):
+    return tuple(column_data(df[column]) for column in encoded_columns + ['time:timestamp'] if column in df.columns)
+
+# The memoization of a value calculated from a dataframe gets defined as a function, the value is calculated only once per dataframe and removed again as soon as the dataframe is deleted, it is calculated again if the number of rows changed or one of the columns it is calculated from got replaced (values changed in place within a column are not noticed)
+def memoize(df, name, calculate):
+    key = (id(df), name)
+    identity = columns_identity(df)
+    if key in memoized_values:
+        reference, length, memoized_identity, value = memoized_values[key]
+        if reference() is df and length == len(df) and len(memoized_identity) == len(identity) and all(a is b for a, b in zip(memoized_identity, identity)):
+            return value
+    value = calculate(df)
+    memoized_values[key] = (weakref.ref(df), len(df), identity, value)
+    weakref.finalize(df, memoized_values.pop, key, None)
+    return value
+
+# The dictionary encoding of a column gets defined as a function, the values are replaced by int32 codes and the lookup table maps the codes back to the values, the codes are sorted like the values and missing values get the code -1, the codes of categorical columns (like the ones of a cached log) are taken over if their categories are sorted and all of them occur
+def encode_column(column):
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        codes = column.cat.codes.to_numpy()
+        if column.cat.categories.is_monotonic_increasing and (len(column.cat.categories) == 0 or np.bincount(codes[codes >= 0], minlength=len(column.cat.categories)).all()):
+            return codes.astype(np.int32), pd.Index(column.cat.categories)
+
+        # Otherwise the values are factorized, the order of the categories would not be the order of the values
+        column = column.astype(column.cat.categories.dtype)
+    codes, lookup = pd.factorize(column, sort=True)
+    return codes.astype(np.int32), pd.Index(lookup)
+
+# The conversion of a timestamp column to int64 nanoseconds gets defined as a function
+def encode_timestamps(column):
+    return pd.to_datetime(column).to_numpy(dtype='datetime64[ns]').view(np.int64)
+
+# The compact representation of an event log, the cases, activities, resources and lifecycle transitions are stored as int32 codes with a lookup table each, and the timestamps as int64 nanoseconds
+class CompactLog:
+
+    def __init__(self, df):
+        self.length = len(df)
+        self.codes = {}
+        self.lookup = {}
+        for column in encoded_columns:
+            if column in df.columns:
+                self.codes[column], self.lookup[column] = encode_column(df[column])
+        self.timestamps = encode_timestamps(df['time:timestamp']) if 'time:timestamp' in df.columns else None
+
+    # The code of a value in a column is retrieved, values that don't occur in the column get the code -2 so they never match anything
+    def code_of(self, column, value):
+        code = self.lookup[column].get_indexer([value])[0]
+        return code if code >= 0 else -2
+
+    # A mask for the events that have the given value in a column is retrieved, it is the same as df[column] == value but compares integers instead of strings
+    def mask(self, column, value):
+        return self.codes[column] == self.code_of(column, value)
+
+    # A mask for the events that have any of the given values in a column is retrieved, it is the same as df[column].isin(values)
+    def isin(self, column, values):
+        codes = self.lookup[column].get_indexer(values)
+        return np.isin(self.codes[column], codes[codes >= 0])
+
+    # The values of a column are retrieved by looking up the codes of the given events
+    def values(self, column, events=slice(None)):
+        codes = self.codes[column][events]
+        return np.where(codes >= 0, self.lookup[column].to_numpy(dtype=object)[codes], np.nan)
+
+# The compact representation of a dataframe gets defined as a function, it is only created once per dataframe
+def compact_log(df):
+    return memoize(df, 'compact_log', CompactLog)
@@ -0,0 +1,49 @@
+import pandas as pd
+import numpy as np
+from compactlog import NAT, compact_log, memoize
+from profiling import profiled
+
+# The calculation of the order of the events and their durations gets defined as a function, it works on the integer codes and int64 timestamps of the compact representation of the log
+def order_and_durations(df):
+
+    # The codes of the cases and activities (sorted like the original values) and the timestamps as int64 nanoseconds are retrieved
+    compact = compact_log(df)
+    case_codes = compact.codes['case:concept:name']
+    activity_codes = compact.codes['concept:name']
+    timestamps = compact.timestamps
+    valid = (case_codes >= 0) & (activity_codes >= 0) & (timestamps != NAT)
+
+    # The events are sorted by case and timestamp, missing values are sorted last just like sort_values does it
+    case_key = np.where(case_codes >= 0, case_codes, np.iinfo(np.int32).max)
+    timestamp_key = np.where(timestamps != NAT, timestamps, np.iinfo(np.int64).max)
+    order = np.lexsort((timestamp_key, case_key))
+
+    # Within this order, the events of each combination of case and activity are placed next to each other so the previous event of the same activity in the same case is always the one before
+    group_order = order[np.lexsort((np.arange(len(order)), activity_codes[order], case_codes[order]))]
+    same_group = (case_codes[group_order][1:] == case_codes[group_order][:-1]) & (activity_codes[group_order][1:] == activity_codes[group_order][:-1]) & valid[group_order][1:] & valid[group_order][:-1]
+
+    # The duration of each event is the time passed since the previous event of the same activity in the same case, "start" events don't have a duration
+    duration_ns = np.full(len(df), NAT, dtype=np.int64)
+    duration_ns[group_order[1:][same_group]] = timestamps[group_order][1:][same_group] - timestamps[group_order][:-1][same_group]
+    duration_ns[compact.mask('lifecycle:transition', 'start')] = NAT
+    return order, duration_ns
+
+# The calculation of the order of the events and their durations is memoized on the dataframe, so it is only calculated once per log, no matter how many detection functions need it
+def calculate_durations(df):
+    return memoize(df, 'durations', order_and_durations)
+
+# The calculation of the time taken for each event gets defined as a function, it is measured as the "duration calculation" phase when profiling is enabled
+@profiled('duration calculation')
+def calculate_time_taken(df):
+
+    # Takes a dataframe representing the event log and returns it sorted by case and timestamp, with a duration column in seconds added
+    order, duration_ns = calculate_durations(df)
+    df = df.take(order)
+    df['time:timestamp'] = pd.to_datetime(df['time:timestamp'])
+
+    # Adds a duration column to the dataframe, the duration is NaN for "start" events
+    duration_ns = duration_ns[order]
+    df['duration'] = np.where(duration_ns != NAT, duration_ns / 1e9, np.nan)
+
+    # Returns the dataframe with the new "duration" attribute
+    return df
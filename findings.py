@@ -0,0 +1,101 @@
+import pandas as pd
+import os
+from profiling import profile_phase
+
+# When the findings get collected (e.g. in the worker processes of the parallel mode), each call of write_findings is stored in this list instead of writing the results, it is None as long as nothing gets collected
+collected_findings = None
+
+# When the findings get buffered (e.g. when running the detectors with runall.py), the calls of write_findings are stored for each path and only written once at the end of the run, it is None as long as nothing gets buffered
+buffered_findings = None
+
+# The format the findings get written in, the output csv path of the scripts gets the according file extension
+findings_format = 'csv'
+
+# In quiet mode, the detected patterns are not printed to the console
+quiet = False
+
+# The printing of a detected pattern gets defined as a function, it is used by the detection functions instead of print so the output can be suppressed in quiet mode
+def report(*args, **kwargs):
+    if not quiet:
+        print(*args, **kwargs)
+
+# The path the findings get written to gets defined as a function, it is the output csv path with the file extension of the chosen format
+def findings_path(output_csv_path):
+    return os.path.splitext(output_csv_path)[0] + '.' + findings_format if findings_format != 'csv' else output_csv_path
+
+# The writing of the findings to a csv table gets defined as a function, the file is only opened once for all calls, the header is only written if the file does not exist yet unless specified otherwise
+def write_csv(path, calls):
+    file_exists = os.path.exists(path)
+    with open(path, 'a', newline='') as csv_file:
+        for results, header in calls:
+            pd.DataFrame(results).to_csv(csv_file, index=False, header=not file_exists if header is None else header)
+            file_exists = True
+
+# The writing of the findings to a table in .parquet format gets defined as a function, the columns with mixed values (e.g. times and empty strings) are stored as strings and findings from earlier calls are kept
+def write_parquet(path, calls):
+    results_df = pd.concat([pd.DataFrame(results) for results, header in calls], ignore_index=True)
+    for column in results_df.columns[results_df.dtypes == object]:
+        results_df[column] = results_df[column].astype('string')
+    if os.path.exists(path):
+        results_df = pd.concat([pd.read_parquet(path), results_df], ignore_index=True)
+    results_df.to_parquet(path, index=False)
+
+# The writing of the findings to a file in .jsonl format gets defined as a function, each finding is written as one line
+def write_jsonl(path, calls):
+    with open(path, 'a') as jsonl_file:
+        for results, header in calls:
+            if results:
+                pd.DataFrame(results).to_json(jsonl_file, orient='records', lines=True, date_format='iso', default_handler=str)
+
+# The functions writing the findings in each of the possible formats
+findings_writers = {
+    'csv': write_csv,
+    'parquet': write_parquet,
+    'jsonl': write_jsonl
+}
+
+# The buffering of the findings gets defined as a function, the findings of all detection functions are kept in memory until flush_findings is called
+def buffer_findings(output_format='csv', quiet_mode=False):
+    global buffered_findings, findings_format, quiet
+    if output_format not in findings_writers:
+        raise ValueError(f"Unknown findings format {output_format}, possible formats are: {', '.join(findings_writers)}")
+    buffered_findings = {}
+    findings_format = output_format
+    quiet = quiet_mode
+
+# The writing of all buffered findings gets defined as a function, each file is written in one batch
+def flush_findings():
+    global buffered_findings
+    if not buffered_findings:
+        return
+    with profile_phase('findings writing', sum(len(results) for calls in buffered_findings.values() for results, header in calls)):
+        for path, calls in buffered_findings.items():
+            findings_writers[findings_format](path, calls)
+            report(f"Results appended to {path}")
+    buffered_findings = {}
+
+# The sorting of the findings by case gets defined as a function, the findings are sorted by the value of their case just like a groupby over the cases sorts them and the findings of the same case keep their order, so they are the same no matter in which order the cases were regarded (e.g. chunk by chunk in streaming mode or partition by partition in parallel mode)
+def sort_by_case(results):
+    results.sort(key=lambda results_entry: results_entry['Case'])
+    return results
+
+# The writing of the results of a detection function gets defined as a function, the header is only written if the file does not exist yet unless specified otherwise
+def write_findings(results, output_csv_path, header=None):
+
+    # If the findings get collected, the results and the header are stored so the collecting process can write them later
+    if collected_findings is not None:
+        collected_findings.append((results, header))
+        return
+
+    # The results are only written if an according path got specified
+    if not output_csv_path:
+        return
+    path = findings_path(output_csv_path)
+
+    # If the findings get buffered, they are written when flush_findings is called, otherwise they are written right away
+    if buffered_findings is not None:
+        buffered_findings.setdefault(path, []).append((results, header))
+    else:
+        with profile_phase('findings writing', len(results)):
+            findings_writers[findings_format](path, [(results, header)])
+        report(f"Results appended to {path}")
@@ -0,0 +1,199 @@
+import pandas as pd
+import numpy as np
+from xesstream import iter_chunks
+from compactlog import NAT, encode_column, encode_timestamps
+from profiling import profiled
+
+# The time interval in seconds in which the completions (or starts) of events of two resources have to be registered to count as near-simultaneous
+simultaneity_window = 600
+
+# Since the start and completion timestamps of each event are usually registered separate in the event logs and it is easier for the detection of groups to regard an event as one entry, they get merged in this function here, it is measured as the "group work merging" phase when profiling is enabled
+@profiled('group work merging')
+def merge_start_complete_timestamps(df):
+
+    # The entries for the start and completion timestamps are retrieved
+    start_events = df[df['lifecycle:transition'].str.lower() == 'start']
+    complete_events = df[df['lifecycle:transition'].str.lower() == 'complete']
+
+    # Those entries get merged if the other attributes are similar
+    merged_events = pd.merge(start_events, complete_events, on=['org:resource', 'concept:name', 'case:concept:name'])
+
+    # Renames the columns containing the timestamps to differentiate between them
+    merged_events.rename(columns={'time:timestamp_x': 'startTimestamp', 'time:timestamp_y': 'completeTimestamp'}, inplace=True)
+
+    # Returns the dataframe with the now merged entries for the two timestamps
+    return merged_events[[ 'org:resource', 'concept:name', 'startTimestamp', 'completeTimestamp', 'case:concept:name']]
+
+# First condition for the detection of an event as group work: Two events from the same case overlap in time while also being associated with different resources
+def detect_overlapping_work(case_codes, resource_codes, starts, completes):
+
+    # An array for the flags is initialized, only events with both timestamps can overlap with other events
+    flags = np.zeros(len(case_codes), dtype=bool)
+    valid = np.flatnonzero((case_codes >= 0) & (starts != NAT) & (completes != NAT))
+    if len(valid) == 0:
+        return flags
+    cases, resources = case_codes[valid].astype(np.int64), resource_codes[valid]
+
+    # The timestamps are replaced by their ranks, so they can be combined with the case into one sort key
+    times = np.unique(np.concatenate([starts[valid], completes[valid]]))
+    start_ranks = np.searchsorted(times, starts[valid])
+    complete_ranks = np.searchsorted(times, completes[valid])
+    width = len(times) + 1
+
+    # The events are sorted by case and start timestamp
+    order = np.lexsort((start_ranks, cases))
+    start_keys = cases[order] * width + start_ranks[order]
+
+    # Sweeping through the sorted events, the latest completion up to each event and the latest completion of any other resource than the one it belongs to are recorded for each case
+    best_completes = np.empty(len(order), dtype=np.int64)
+    best_resources = np.empty(len(order), dtype=np.int64)
+    second_completes = np.empty(len(order), dtype=np.int64)
+    previous_case = None
+    for k, (case, resource, complete) in enumerate(zip(cases[order].tolist(), resources[order].tolist(), complete_ranks[order].tolist())):
+        if case != previous_case:
+            best_complete, best_resource, second_complete = -1, -1, -1
+            previous_case = case
+        if resource == best_resource:
+            best_complete = max(best_complete, complete)
+        elif complete > best_complete:
+            second_complete = best_complete
+            best_complete, best_resource = complete, resource
+        elif complete > second_complete:
+            second_complete = complete
+        best_completes[k], best_resources[k], second_completes[k] = best_complete, best_resource, second_complete
+
+    # For each event, the last event of the same case that started before its completion is searched, an event of another resource overlaps with it if that resource completed an event after the start of the regarded event
+    last_started = np.searchsorted(start_keys, cases * width + complete_ranks, side='right') - 1
+    found = last_started >= 0
+    found[found] = cases[order][last_started[found]] == cases[found]
+    last_started = last_started[found]
+    other_completes = np.where(best_resources[last_started] != resources[found], best_completes[last_started], second_completes[last_started])
+    flags[valid[found]] = other_completes >= start_ranks[found]
+    return flags
+
+# Second condition for the detection of an event as group work: Two events with the same activity get registered in the same case while also being associated with different resources
+def detect_shared_activities(case_codes, activity_codes, resource_codes):
+    events = pd.DataFrame({'case': case_codes, 'activity': activity_codes, 'resource': resource_codes})
+    resource_counts = events.groupby(['case', 'activity'])['resource'].transform('nunique').to_numpy()
+    return (case_codes >= 0) & (activity_codes >= 0) & (resource_counts > 1)
+
+# Third condition for the detection of an event as group work: Two different resources each have 10 or more events registered in the same case
+def detect_many_events(case_codes, resource_codes):
+    events = pd.DataFrame({'case': case_codes, 'resource': resource_codes})
+    many_events = (case_codes >= 0) & (resource_codes >= 0) & (events.groupby(['case', 'resource'])['resource'].transform('size').to_numpy() > 9)
+    resources_with_many_events = events[many_events].groupby('case')['resource'].nunique()
+    return many_events & (events['case'].map(resources_with_many_events).fillna(0).to_numpy() > 1)
+
+# The search of the events of the same group (e.g. case) registered within a window around their timestamp gets defined as a function, the timestamps are replaced by their ranks so they can be combined with the group into one sort key, it returns the events sorted by group and timestamp, their sort keys and the range of the sorted events within the window of each of them
+def window_ranges(group_codes, timestamps, events, window):
+
+    # The events are sorted by timestamp, so the ranks of the timestamps and of the bounds of their windows are found with binary searches in sorted order
+    by_time = events[np.argsort(timestamps[events], kind='stable')]
+    sorted_times = timestamps[by_time]
+    new_time = np.ones(len(by_time), dtype=bool)
+    new_time[1:] = sorted_times[1:] != sorted_times[:-1]
+    times = sorted_times[new_time]
+    ranks, lower_ranks, upper_ranks = (np.zeros(len(timestamps), dtype=np.int64) for _ in range(3))
+    ranks[by_time] = np.cumsum(new_time) - 1
+    lower_ranks[by_time] = np.searchsorted(times, sorted_times - window)
+    upper_ranks[by_time] = np.searchsorted(times, sorted_times + window, side='right') - 1
+
+    # The events are sorted by group and timestamp, the bounds of the windows are then in the same order as the sorted keys
+    width = len(times) + 1
+    sorted_events = by_time[np.argsort(group_codes[by_time], kind='stable')]
+    groups = group_codes[sorted_events].astype(np.int64) * width
+    sorted_keys = groups + ranks[sorted_events]
+    return sorted_events, sorted_keys, np.searchsorted(sorted_keys, groups + lower_ranks[sorted_events]), np.searchsorted(sorted_keys, groups + upper_ranks[sorted_events], side='right')
+
+# Fourth condition for the detection of an event as group work: Two different resources each have an event registered in at least 3 different time intervals of 10 minutes (or of the given window in seconds), the intervals are the pairs of completion timestamps of events of different resources in the same case that were completed or started within the window of each other
+def detect_simultaneous_completions(case_codes, resource_codes, starts, completes, window=None):
+
+    # An array for the flags is initialized, only events with a case and a resource are regarded
+    flags = np.zeros(len(case_codes), dtype=bool)
+    window = (simultaneity_window if window is None else window) * 10**9
+    valid = (case_codes >= 0) & (resource_codes >= 0)
+    if not valid.any():
+        return flags
+
+    # Each combination of case and resource gets a code, the intervals are counted for these combinations
+    case_resource_codes = case_codes.astype(np.int64) * (int(resource_codes.max()) + 1) + resource_codes
+    cell_codes, cells = pd.factorize(case_resource_codes[valid])
+    cell_of_event = np.full(len(case_codes), -1, dtype=np.int64)
+    cell_of_event[valid] = cell_codes
+    case_codes = case_codes.astype(np.int64)
+
+    # For the completion and the start timestamps, the events of the same case (and of the same resource) within the window of each event are found with a binary search on the sorted events, the number of events of other resources within the window is an upper bound for the number of intervals an event contributes
+    upper_bounds = np.zeros(len(cells), dtype=np.int64)
+    definitely_flagged = np.zeros(len(cells), dtype=bool)
+    join = {}
+    for name, timestamps in (('complete', completes), ('start', starts)):
+        events = np.flatnonzero(valid & (timestamps != NAT))
+        if len(events) == 0:
+            continue
+        sorted_events, sorted_keys, lower, upper = window_ranges(case_codes, timestamps, events, window)
+        events_of_cell, _, same_resource_lower, same_resource_upper = window_ranges(cell_of_event, timestamps, events, window)
+        same_resource = np.zeros(len(case_codes), dtype=np.int64)
+        same_resource[events_of_cell] = same_resource_upper - same_resource_lower
+        events, same_resource = sorted_events, same_resource[sorted_events]
+        other_resource = upper - lower - same_resource
+        upper_bounds += np.bincount(cell_of_event[events], weights=other_resource, minlength=len(cells)).astype(np.int64)
+        join[name] = (events, sorted_events, lower, upper)
+
+        # Within the window of the completion, the events of other resources have at least as many different completion timestamps as there are different ones in the window minus the events of the same resource, if these are 3 or more, the resource has at least 3 intervals
+        if name == 'complete':
+            new_value = np.ones(len(sorted_keys), dtype=np.int64)
+            new_value[1:] = sorted_keys[1:] != sorted_keys[:-1]
+            distinct_before = np.concatenate([[0], np.cumsum(new_value)])
+            distinct_completes = distinct_before[upper] - distinct_before[lower]
+            definitely_flagged[cell_of_event[events][distinct_completes - same_resource > 2]] = True
+
+    # The resources with fewer than 3 events of other resources within their windows can't have 3 intervals, for the remaining ones the pairs of events within the windows are joined and the different intervals are counted exactly
+    undecided = ~definitely_flagged & (upper_bounds > 2)
+    pairs = []
+    for events, sorted_events, lower, upper in join.values():
+        regarded = undecided[cell_of_event[events]]
+        events, lower, upper = events[regarded], lower[regarded], upper[regarded]
+        counts = upper - lower
+        event_of_pair = np.repeat(events, counts)
+        other_of_pair = sorted_events[np.repeat(lower - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())]
+        pairs.append((event_of_pair, other_of_pair))
+    if pairs:
+        event_of_pair = np.concatenate([pair[0] for pair in pairs])
+        other_of_pair = np.concatenate([pair[1] for pair in pairs])
+        other = resource_codes[event_of_pair] != resource_codes[other_of_pair]
+        event_of_pair, other_of_pair = event_of_pair[other], other_of_pair[other]
+
+        # Each interval is the pair of the completion timestamps, ordered by resource, it counts for both resources
+        lower_first = resource_codes[event_of_pair] < resource_codes[other_of_pair]
+        first_complete = np.where(lower_first, completes[event_of_pair], completes[other_of_pair])
+        second_complete = np.where(lower_first, completes[other_of_pair], completes[event_of_pair])
+        intervals = np.unique(np.stack([cell_of_event[event_of_pair], first_complete, second_complete], axis=1), axis=0)
+        definitely_flagged |= np.bincount(intervals[:, 0], minlength=len(cells)) > 2
+
+    # All events of resources with at least 3 intervals get flagged
+    flags[valid] = definitely_flagged[cell_codes]
+    return flags
+
+# An algorithm for the detection of groups in the log gets defined as a function, each condition is evaluated on sorted arrays instead of comparing every pair of events, it is measured as the "group work flagging" phase when profiling is enabled
+@profiled('group work flagging')
+def add_group_work_flag(df, window=None):
+
+    # The cases, resources and activities are encoded as int32 codes (sorted like the original values) and the timestamps as int64 nanoseconds
+    case_codes = encode_column(df['case:concept:name'])[0]
+    resource_codes = encode_column(df['org:resource'])[0]
+    activity_codes = encode_column(df['concept:name'])[0]
+    starts = encode_timestamps(df['startTimestamp'])
+    completes = encode_timestamps(df['completeTimestamp'])
+
+    # Adds a Group Work Flag column to the dataframe, which is true if any of the conditions for group work is met
+    df['GroupWorkFlag'] = (detect_overlapping_work(case_codes, resource_codes, starts, completes)
+                           | detect_shared_activities(case_codes, activity_codes, resource_codes)
+                           | detect_many_events(case_codes, resource_codes)
+                           | detect_simultaneous_completions(case_codes, resource_codes, starts, completes, window))
+
+# The flagging of group work in a log that is iterated through in chunks of complete cases gets defined as a function, since all conditions only regard events within the same case, each chunk is merged and flagged on its own
+def iter_group_work(log, traces_per_chunk=1000):
+    for chunk in iter_chunks(log, traces_per_chunk):
+        merged_events = merge_start_complete_timestamps(chunk)
+        add_group_work_flag(merged_events)
+        yield merged_events
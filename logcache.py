@@ -0,0 +1,102 @@
+import pm4py
+import pandas as pd
+import hashlib
+import json
+import os
+
+# The columns that only contain a limited number of different values, they are kept as categorical columns, so each value is only stored once and the compact representation of the log (see compactlog.py) can take over their codes
+categorical_columns = ['case:concept:name', 'concept:name', 'org:resource', 'lifecycle:transition']
+
+# The conversion of a log to a dataframe gets defined as a function, dataframes (like the ones read through the cache) are returned as they are, since pm4py only accepts string columns for the cases and activities and would reject the categorical ones, event logs are converted with pm4py
+def to_dataframe(log):
+    if isinstance(log, pd.DataFrame):
+        return log
+    return pm4py.convert_to_dataframe(log)
+
+# The calculation of the hash of a file gets defined as a function, the file is read in chunks so it never has to be loaded into memory completely
+def calculate_file_hash(path, chunk_size=1 << 20):
+    file_hash = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(chunk_size), b''):
+            file_hash.update(chunk)
+    return file_hash.hexdigest()
+
+# The reading of an event log through the cache gets defined as a function, the parsed event table is stored in a columnar .parquet file next to the log (or in the given cache directory) and reused as long as the log file did not change
+def read_log(log_path, cache_dir=None):
+
+    # The cache files are stored next to the log per default
+    if cache_dir is None:
+        cache_dir = os.path.dirname(os.path.abspath(log_path))
+    log_name = os.path.basename(log_path)
+    metadata_path = os.path.join(cache_dir, f"{log_name}.cache.json")
+
+    # The metadata of the cache from a previous run is loaded, if there is any
+    metadata = None
+    if os.path.exists(metadata_path):
+        with open(metadata_path) as metadata_file:
+            metadata = json.load(metadata_file)
+
+    # The hash of the log file only gets calculated again if its modification time or size changed since the cache was written
+    file_stat = os.stat(log_path)
+    if metadata and metadata['mtime_ns'] == file_stat.st_mtime_ns and metadata['size'] == file_stat.st_size:
+        file_hash = metadata['hash']
+    else:
+        file_hash = calculate_file_hash(log_path)
+    cache_path = os.path.join(cache_dir, f"{log_name}.{file_hash[:16]}.parquet")
+
+    # If the content of the log file did not change, the cached event table is read instead of parsing the log again
+    if metadata and metadata['hash'] == file_hash and os.path.exists(cache_path):
+        try:
+            df = pd.read_parquet(cache_path)
+        except ImportError:
+            df = None
+        if df is not None:
+
+            # The categorical columns stay categorical, just like after parsing the log
+            df.attrs = metadata['attrs']
+
+            # If only the modification time of the log changed, the metadata is updated so the hash does not have to be calculated again next time
+            if metadata['mtime_ns'] != file_stat.st_mtime_ns:
+                metadata['mtime_ns'] = file_stat.st_mtime_ns
+                with open(metadata_path, 'w') as metadata_file:
+                    json.dump(metadata, metadata_file)
+            return df
+
+    # Otherwise the event log is parsed and converted to a dataframe
+    log = pm4py.read_xes(log_path)
+    df = pm4py.convert_to_dataframe(log)
+
+    # Timestamps that did not get parsed as such are converted to timestamps
+    if 'time:timestamp' in df.columns and not pd.api.types.is_datetime64_any_dtype(df['time:timestamp']):
+        df['time:timestamp'] = pd.to_datetime(df['time:timestamp'], utc=True)
+
+    # The columns with a limited number of values are converted to categorical columns, the strings of the parsed log are not kept
+    df = df.astype({column: 'category' for column in categorical_columns if column in df.columns})
+
+    # The event table is written to the cache, if no library for writing .parquet files is installed, the log simply does not get cached
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        df.to_parquet(cache_path)
+    except ImportError:
+        print("No engine for .parquet files (pyarrow or fastparquet) is installed, the event log does not get cached")
+        return df
+
+    # The cache file of the previous version of the log is removed, since it cannot be used anymore
+    if metadata and metadata['hash'] != file_hash:
+        previous_cache_path = os.path.join(cache_dir, f"{log_name}.{metadata['hash'][:16]}.parquet")
+        if os.path.exists(previous_cache_path):
+            os.remove(previous_cache_path)
+
+    # The metadata needed to validate and restore the cached event table is stored next to it
+    metadata = {
+        'log_path': os.path.abspath(log_path),
+        'hash': file_hash,
+        'mtime_ns': file_stat.st_mtime_ns,
+        'size': file_stat.st_size,
+        'attrs': df.attrs
+    }
+    with open(metadata_path, 'w') as metadata_file:
+        json.dump(metadata, metadata_file)
+
+    # The parsed dataframe is returned
+    return df
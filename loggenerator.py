@@ -0,0 +1,104 @@
+import pm4py
+import pandas as pd
+import numpy as np
+import argparse
+
+# The weasel patterns that can be injected into the generated cases, each injected case gets exactly one of them
+weasel_patterns = ['performance_masking', 'gold_plating', 'reordering', 'idling', 'group_work']
+
+# The start of the time span the generated cases are spread over, it lies before the boss takeover timestamp used in the scripts so there are events before and after it
+log_start = pd.Timestamp("2023-07-15 08:00:00", tz='UTC')
+
+# The generation of a synthetic event log gets defined as a function, each activity instance is registered as a "start" and a "complete" event, so a case has events_per_case events on average
+def generate_log(num_cases, events_per_case=20, num_resources=10, num_activities=8, weasel_rate=0.1, days=30, seed=0):
+
+    # All values are drawn as whole arrays, so even logs with millions of events are generated within seconds
+    rng = np.random.default_rng(seed)
+
+    # The number of activity instances of each case is drawn, every case has at least one
+    instances_per_case = rng.poisson(max(events_per_case / 2 - 1, 0), num_cases) + 1
+    case_of_instance = np.repeat(np.arange(num_cases), instances_per_case)
+    first_instance = np.concatenate([[0], np.cumsum(instances_per_case)[:-1]])
+    position = np.arange(len(case_of_instance)) - first_instance[case_of_instance]
+    case_length = instances_per_case[case_of_instance]
+
+    # The activities, resources, the waiting times before each activity instance and the durations are drawn in seconds
+    activities = rng.integers(num_activities, size=len(case_of_instance))
+    resources = rng.integers(num_resources, size=len(case_of_instance))
+    gaps = rng.exponential(600, len(case_of_instance)).astype(np.int64)
+    durations = rng.exponential(1200, len(case_of_instance)).astype(np.int64) + 30
+
+    # The weasel patterns are assigned to a share of the cases, the other cases get no pattern
+    case_patterns = np.full(num_cases, 'none', dtype=object)
+    weasel_cases = rng.random(num_cases) < weasel_rate
+    case_patterns[weasel_cases] = rng.choice(weasel_patterns, int(weasel_cases.sum()))
+    instance_patterns = case_patterns[case_of_instance]
+
+    # Performance Masking: The same activity is repeated throughout the case and each repetition is completed within a few seconds
+    injected = instance_patterns == 'performance_masking'
+    activities[injected] = activities[first_instance[case_of_instance[injected]]]
+    durations[injected] = 10
+
+    # Gold Plating: The case ends with an activity that does not occur anywhere else in the log
+    injected = (instance_patterns == 'gold_plating') & (position == case_length - 1)
+    activities[injected] = num_activities
+
+    # Re-Ordering: The activities of the case are performed in reverse order
+    injected = instance_patterns == 'reordering'
+    activities[injected] = activities[(first_instance[case_of_instance] + case_length - 1 - position)[injected]]
+
+    # Idling: There is a break of several hours before the second activity of the case
+    injected = (instance_patterns == 'idling') & (position == 1)
+    gaps[injected] += 6 * 3600
+
+    # Group Work: Two resources take turns on the activities of the case, which all overlap in time
+    injected = instance_patterns == 'group_work'
+    resources[injected] = (resources[first_instance[case_of_instance[injected]]] + position[injected] % 2) % num_resources
+    gaps[injected] = 60
+
+    # The start of each activity instance is the start of the case plus the waiting times of all instances before it in the same case
+    case_starts = rng.integers(0, days * 86400, num_cases)
+    gaps[first_instance] = 0
+    cumulative_gaps = np.cumsum(gaps)
+    starts = case_starts[case_of_instance] + cumulative_gaps - cumulative_gaps[first_instance[case_of_instance]]
+    completes = starts + durations
+
+    # The "start" and "complete" events of each activity instance are created and sorted by case and timestamp
+    instances = np.repeat(np.arange(len(case_of_instance)), 2)
+    is_start = np.tile([True, False], len(case_of_instance))
+    timestamps = np.where(is_start, starts[instances], completes[instances])
+    order = np.lexsort((timestamps, case_of_instance[instances]))
+    instances, is_start, timestamps = instances[order], is_start[order], timestamps[order]
+
+    # The codes are converted to the values used in the example logs
+    case_names = np.array([f"case {i + 1}" for i in range(num_cases)], dtype=object)
+    activity_names = np.array([f"Activity {i + 1}" for i in range(num_activities)] + ["Extra work"], dtype=object)
+    resource_names = np.array([f"Resource {i + 1}" for i in range(num_resources)], dtype=object)
+
+    # Returns the event log as a dataframe with the columns pm4py.convert_to_dataframe creates, the injected pattern of each case is stored as a case attribute
+    return pd.DataFrame({
+        'concept:name': activity_names[activities[instances]],
+        'org:resource': resource_names[resources[instances]],
+        'lifecycle:transition': np.where(is_start, 'start', 'complete').astype(object),
+        'time:timestamp': log_start + pd.to_timedelta(timestamps, unit='s'),
+        'case:concept:name': case_names[case_of_instance[instances]],
+        'case:weasel': case_patterns[case_of_instance[instances]],
+    })
+
+
+if __name__ == "__main__":
+
+    # The size of the log, the share of cases with a weasel pattern and the path of the generated log can be specified on the command line
+    parser = argparse.ArgumentParser(description="Generates a synthetic event log with injected weasel patterns")
+    parser.add_argument('log_path', help="path the event log gets written to in .xes format")
+    parser.add_argument('--cases', type=int, default=1000, help="number of cases")
+    parser.add_argument('--events-per-case', type=int, default=20, help="average number of events per case")
+    parser.add_argument('--resources', type=int, default=10, help="number of resources")
+    parser.add_argument('--activities', type=int, default=8, help="number of activities")
+    parser.add_argument('--weasel-rate', type=float, default=0.1, help="share of cases with an injected weasel pattern")
+    parser.add_argument('--seed', type=int, default=0, help="seed of the random number generator")
+    args = parser.parse_args()
+
+    df = generate_log(args.cases, args.events_per_case, args.resources, args.activities, args.weasel_rate, seed=args.seed)
+    pm4py.write_xes(df, args.log_path)
+    print(f"Generated {len(df)} events in {args.cases} cases, written to {args.log_path}")
@@ -0,0 +1,87 @@
+import pandas as pd
+import numpy as np
+import contextlib
+import functools
+import importlib
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor
+import findings
+from findings import write_findings, sort_by_case
+from groupwork import add_group_work_flag
+
+# The number of partitions per process, using more partitions than processes evens out the load if some cases are much larger than others
+partitions_per_process = 4
+
+# The partitioning of a log by case gets defined as a function, each case is assigned to a partition by a hash of its name, so all events of a case end up in the same partition and the assignment is the same in every run, the log is split in one pass by sorting the events by partition (keeping their order within each partition)
+def partition_cases(df, num_partitions):
+    case_hashes = pd.util.hash_array(df['case:concept:name'].astype(str).to_numpy(dtype=object))
+    partition_of_event = (case_hashes % np.uint64(num_partitions)).astype(np.int64)
+    order = np.argsort(partition_of_event, kind='stable')
+    boundaries = np.cumsum(np.bincount(partition_of_event, minlength=num_partitions))[:-1]
+    return [df.take(events) for events in np.split(order, boundaries) if len(events) > 0]
+
+# The application of a function to each partition in a pool of processes gets defined as a function, the results are returned in the order of the partitions
+def map_partitions(function, partitions, processes):
+    if processes <= 1 or len(partitions) <= 1:
+        return [function(partition) for partition in partitions]
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        return list(executor.map(function, partitions))
+
+# The call of a detection function on one partition gets defined as a function, it is run in the worker processes, the findings are collected instead of written and the printed output is captured, the quiet mode and the format of the findings are passed explicitly since worker processes that are spawned (e.g. on Windows and macOS) don't inherit them
+def run_detector_partition(module_name, function_name, parameters, quiet, findings_format, partition):
+    module = importlib.import_module(module_name)
+    output_csv_path = getattr(module, 'output_csv_path', '')
+    module.output_csv_path = ''
+    findings.collected_findings = []
+    findings.quiet, findings.findings_format = quiet, findings_format
+    output = io.StringIO()
+    try:
+        with contextlib.redirect_stdout(output):
+            getattr(module, function_name)(partition, **parameters)
+        return output.getvalue(), findings.collected_findings
+    finally:
+        findings.collected_findings = None
+        module.output_csv_path = output_csv_path
+
+# The parallel execution of a detection function that only regards events within the same case gets defined as a function, the cases are hash-partitioned across a pool of processes and the findings are merged in the order of the cases, so they are the same as when running the function on the whole log
+def run_case_partitioned(module, function_name, df, parameters=None, processes=None):
+
+    # If the number of processes is not specified, all cores are used
+    processes = processes or os.cpu_count()
+    partitions = partition_cases(df, processes * partitions_per_process)
+    outputs = map_partitions(functools.partial(run_detector_partition, module.__name__, function_name, parameters or {}, findings.quiet, findings.findings_format), partitions, processes)
+
+    # The printed output of the partitions is printed in the order of the partitions (unless in quiet mode), and the findings of all partitions are sorted by case
+    results = []
+    header = None
+    for printed, collected in outputs:
+        if not findings.quiet:
+            print(printed, end='')
+        for partition_results, partition_header in collected:
+            results.extend(partition_results)
+            header = partition_header
+    sort_by_case(results)
+
+    # The merged findings are written just like the detection function would write them
+    write_findings(results, module.output_csv_path, header)
+
+# The generation of the model of activity orders for Re-Ordering in parallel gets defined as a function, the variants of the partitions are merged into one variant index
+def generate_activity_orders_partitioned(module, df, processes=None):
+    processes = processes or os.cpu_count()
+    partitions = partition_cases(df, processes * partitions_per_process)
+    variant_indexes = map_partitions(module.generate_activity_orders, partitions, processes)
+    return module.build_variant_index(set().union(*(variant_index['variants'] for variant_index in variant_indexes)))
+
+# The flagging of group work on one partition gets defined as a function, it is run in the worker processes
+def flag_group_work_partition(partition):
+    partition = partition.copy()
+    add_group_work_flag(partition)
+    return partition['GroupWorkFlag']
+
+# The flagging of group work in parallel gets defined as a function, since all conditions only regard events within the same case, each partition of cases is flagged on its own
+def add_group_work_flag_partitioned(df, processes=None):
+    processes = processes or os.cpu_count()
+    partitions = partition_cases(df, processes * partitions_per_process)
+    flags = map_partitions(flag_group_work_partition, partitions, processes)
+    df['GroupWorkFlag'] = pd.concat(flags).reindex(df.index).fillna(False).astype(bool) if flags else False
@@ -0,0 +1,87 @@
+import functools
+import json
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+# Profiling is opt-in, as long as it is not enabled the phases are run without any measurement
+profiling_enabled = False
+
+# A list for the measured phases and a stack for the phases that are currently running, empty at first
+measured_phases = []
+running_phases = []
+
+# The enabling of the profiling gets defined as a function, all measurements from earlier runs are discarded and tracemalloc is started to record the peak memory of each phase
+def enable_profiling():
+    global profiling_enabled
+    profiling_enabled = True
+    measured_phases.clear()
+    running_phases.clear()
+    if not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+# The disabling of the profiling gets defined as a function
+def disable_profiling():
+    global profiling_enabled
+    profiling_enabled = False
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+# The measurement of one phase gets defined as a context manager, phases can be nested (e.g. the duration calculation inside a detection function), the time spent in a phase itself without the phases nested in it is recorded as well
+@contextmanager
+def profile_phase(name, rows=None):
+    if not profiling_enabled:
+        yield
+        return
+
+    # The peak memory of the surrounding phase up to now is stored before the peak is reset for the new phase
+    current_memory, peak_memory = tracemalloc.get_traced_memory()
+    if running_phases:
+        running_phases[-1]['peak'] = max(running_phases[-1]['peak'], peak_memory)
+    tracemalloc.reset_peak()
+    phase = {'name': name, 'start_memory': current_memory, 'peak': current_memory, 'nested_wall': 0.0, 'nested_cpu': 0.0}
+    running_phases.append(phase)
+    start_wall, start_cpu = time.perf_counter(), time.process_time()
+    try:
+        yield
+    finally:
+        wall_seconds, cpu_seconds = time.perf_counter() - start_wall, time.process_time() - start_cpu
+        running_phases.pop()
+        peak_memory = max(phase['peak'], tracemalloc.get_traced_memory()[1])
+
+        # The measurements of the phase are passed on to the surrounding phase, so its peak memory includes the nested phases
+        if running_phases:
+            running_phases[-1]['peak'] = max(running_phases[-1]['peak'], peak_memory)
+            running_phases[-1]['nested_wall'] += wall_seconds
+            running_phases[-1]['nested_cpu'] += cpu_seconds
+
+        # The measurements get stored in the measured phases list
+        measured_phases.append({
+            'phase': name,
+            'parent': running_phases[-1]['name'] if running_phases else None,
+            'rows': rows,
+            'wall_seconds': wall_seconds,
+            'cpu_seconds': cpu_seconds,
+            'self_wall_seconds': wall_seconds - phase['nested_wall'],
+            'self_cpu_seconds': cpu_seconds - phase['nested_cpu'],
+            'peak_allocated_bytes': peak_memory - phase['start_memory']
+        })
+
+# The measurement of every call of a function as a phase gets defined as a decorator, if the first argument is a dataframe its number of rows is recorded
+def profiled(name):
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not profiling_enabled:
+                return function(*args, **kwargs)
+            rows = len(args[0]) if args and hasattr(args[0], 'columns') else None
+            with profile_phase(name, rows):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+# The writing of the measured phases to a report in .json format gets defined as a function
+def write_report(report_path, **metadata):
+    with open(report_path, 'w') as report_file:
+        json.dump({**metadata, 'phases': measured_phases}, report_file, indent=2, default=str)
+    print(f"Profiling report written to {report_path}")
@@ -0,0 +1,215 @@
+import pandas as pd
+import importlib
+import argparse
+import os
+from logcache import read_log, to_dataframe
+from groupwork import merge_start_complete_timestamps, add_group_work_flag, iter_group_work
+from xesstream import iter_traces
+from parallel import run_case_partitioned, generate_activity_orders_partitioned, add_group_work_flag_partitioned
+from findings import buffer_findings, flush_findings, findings_path
+from profiling import enable_profiling, disable_profiling, profile_phase, write_report
+from workcalendar import new_calendar, load_calendar
+
+# The detection functions that can be run, mapped to the script they are defined in, the scripts get imported in this order
+detectors = {
+    'detect_activity_deviation': '1_activitydeviation',
+    'detect_originator_deviation': '2_originatordeviation',
+    'detect_reordering': '3_reordering',
+    'detect_preferential_work_selection_average': '4_preferentialworkselection',
+    'detect_preferential_work_selection_fcfs': '4_preferentialworkselection',
+    'detect_performance_masking': '5_performancemasking',
+    'detect_performance_blowout': '6_performanceblowout',
+    'detect_overwork_hiding': '7_overworkhiding',
+    'detect_gold_plating_duration': '8_goldplating',
+    'detect_gold_plating_rare': '8_goldplating',
+    'detect_idling_resource': '9_idling',
+    'detect_idling_activity': '9_idling',
+    'detect_idling_break': '9_idling',
+    'detect_social_loafing': '10_socialloafing',
+    'detect_peer_mobbing': '11_peermobbing',
+    'detect_boss_mobbing': '12_bossmobbing',
+    'detect_social_borrowing': '13_socialborrowing',
+}
+
+# The default parameters of each detection function, these are the same values that are specified in the individual scripts
+default_parameters = {
+    'detect_activity_deviation': {'k': 2},
+    'detect_originator_deviation': {'min_k': 1, 'max_k': 8},
+    'detect_reordering': {},
+    'detect_preferential_work_selection_average': {'threshold_factor': 0.5},
+    'detect_preferential_work_selection_fcfs': {},
+    'detect_performance_masking': {'threshold_events': 0.5, 'threshold_occurrences': 0.5, 'threshold_time': 120},
+    'detect_performance_blowout': {'threshold_in': 600, 'threshold_sd': 1800, 'window': 5, 'reorder_window': 100},
+    'detect_overwork_hiding': {},
+    'detect_gold_plating_duration': {'threshold': 0.4},
+    'detect_gold_plating_rare': {'threshold': 0.04},
+    'detect_idling_resource': {'threshold': 300},
+    'detect_idling_activity': {'threshold': 600},
+    'detect_idling_break': {'threshold': 14400, 'timeline': 'case'},
+    'detect_social_loafing': {'threshold': 600},
+    'detect_peer_mobbing': {'threshold_dv': 1, 'threshold_pm': 0.4},
+    'detect_boss_mobbing': {'boss_takeover_timestamp': pd.Timestamp("2023-08-01 12:00:00"), 'threshold': 0.4},
+    'detect_social_borrowing': {'threshold': 0.5},
+}
+
+# The detection functions that only regard events within the same case (or only keep running statistics across cases, like Performance Blow-out), in streaming mode they get the log chunk by chunk instead of the whole dataframe
+streaming_detectors = ['detect_reordering', 'detect_overwork_hiding', 'detect_performance_blowout', 'detect_idling_break', 'detect_social_loafing', 'detect_boss_mobbing']
+
+# The detection functions that loop over the log case by case, in parallel mode the cases are partitioned across a pool of processes (for Social Loafing and Boss Mobbing, only the flagging of group work is case-local)
+partitioned_detectors = ['detect_reordering', 'detect_overwork_hiding', 'detect_idling_break']
+
+# The call of a single detection function on the shared dataframe gets defined as a function, intermediate results that are needed by more than one detection function (e.g. the group work table) are stored in the shared dictionary so they only get computed once
+def run_detector(name, module, df, parameters, shared):
+
+    # In streaming mode, Re-Ordering streams the log itself, once for sampling the cases and once for each model and testing segment
+    if name == 'detect_reordering' and shared['streaming']:
+        module.detect_reordering_streaming(shared['log_path'], shared['traces_per_chunk'])
+
+    # In parallel mode, Re-Ordering is applied to the partitions of each testing segment, the models are generated from the partitions of the training segments and merged
+    elif name == 'detect_reordering' and shared['processes'] > 1:
+        l1, l2 = module.split_cases(df)
+        run_case_partitioned(module, 'detect_reordering', l2, {'activity_orders': generate_activity_orders_partitioned(module, l1, shared['processes'])}, shared['processes'])
+        run_case_partitioned(module, 'detect_reordering', l1, {'activity_orders': generate_activity_orders_partitioned(module, l2, shared['processes'])}, shared['processes'])
+
+    # Re-Ordering is applied two times, swapping the roles of the training and testing segments in the second iteration, just like in the script
+    elif name == 'detect_reordering':
+        l1, l2 = module.split_cases(df)
+        module.detect_reordering(l2, module.generate_activity_orders(l1))
+        module.detect_reordering(l1, module.generate_activity_orders(l2))
+
+    # Gold Plating needs the process variants and the activity frequencies of the log, which are only calculated once for both conditions
+    elif name in ('detect_gold_plating_duration', 'detect_gold_plating_rare'):
+        if 'process_variants' not in shared:
+            shared['process_variants'] = module.categorize_process_variants(df)
+        if name == 'detect_gold_plating_duration':
+            module.detect_gold_plating_duration(df, shared['process_variants'], **parameters)
+        else:
+            if 'activity_frequencies' not in shared:
+                shared['activity_frequencies'] = module.calculate_activity_frequencies(df)
+            module.detect_gold_plating_rare(df, shared['process_variants'], shared['activity_frequencies'], **parameters)
+
+    # Social Loafing and Boss Mobbing work on the merged events with the Group Work Flag, which is only calculated once for both of them
+    elif name in ('detect_social_loafing', 'detect_boss_mobbing'):
+        if 'group_work_df' not in shared and shared['streaming']:
+            shared['group_work_df'] = pd.concat(iter_group_work(iter_traces(shared['log_path'], shared['traces_per_chunk'])), ignore_index=True)
+        elif 'group_work_df' not in shared:
+            group_work_df = merge_start_complete_timestamps(df)
+            if shared['processes'] > 1:
+                add_group_work_flag_partitioned(group_work_df, shared['processes'])
+            else:
+                add_group_work_flag(group_work_df)
+            shared['group_work_df'] = group_work_df
+        getattr(module, name)(shared['group_work_df'], **parameters)
+
+    # In streaming mode, the other case-local detection functions get the log chunk by chunk
+    elif name in streaming_detectors and shared['streaming']:
+        getattr(module, name)(iter_traces(shared['log_path'], shared['traces_per_chunk']), **parameters)
+
+    # In parallel mode, the other case-local detection functions get the partitions of the log in a pool of processes (Idling breaks only if they are measured within each case)
+    elif name in partitioned_detectors and shared['processes'] > 1 and parameters.get('timeline', 'case') == 'case':
+        run_case_partitioned(module, name, df, parameters, shared['processes'])
+
+    # All other detection functions only need the dataframe and their parameters
+    else:
+        getattr(module, name)(df, **parameters)
+
+# The detection of all (or the selected) weasel patterns in one event log gets defined as a function, the log only gets parsed and converted to a dataframe once and is then shared by all detection functions
+def run_detectors(log_path, selected_detectors=None, output_dir=None, parameters=None, cache_dir=None, streaming=False, traces_per_chunk=1000, profile=False, processes=1, output_format='csv', quiet=False):
+
+    # If no detectors got selected, all of them are run
+    if selected_detectors is None:
+        selected_detectors = list(detectors)
+    for name in selected_detectors:
+        if name not in detectors:
+            raise ValueError(f"Unknown detector {name}, possible detectors are: {', '.join(detectors)}")
+
+    # The specified parameters overwrite the default parameters of the regarded detectors
+    if parameters is None:
+        parameters = {}
+
+    # Idling breaks on the timeline per resource need the whole log at once, so they can't be detected in streaming mode
+    if streaming and 'detect_idling_break' in selected_detectors and parameters.get('detect_idling_break', {}).get('timeline', default_parameters['detect_idling_break']['timeline']) == 'resource':
+        raise ValueError("Idling breaks on the timeline per resource can't be detected in streaming mode, use timeline 'case' or run without streaming")
+
+    # The findings of all detection functions are buffered and written once at the end of the run, in quiet mode the detected patterns are not printed
+    buffer_findings(output_format, quiet)
+
+    # If profiling is enabled, the wall time, cpu time, processed rows and peak allocated memory of each phase are measured
+    if profile:
+        enable_profiling()
+
+    # The event log is parsed (or read from the cache) and converted to a dataframe only once, in streaming mode only if any of the selected detection functions needs the whole log
+    df = None
+    if not streaming or any(name not in streaming_detectors for name in selected_detectors):
+        with profile_phase('parsing'):
+            log = read_log(log_path, cache_dir)
+        with profile_phase('conversion', len(log)):
+            df = to_dataframe(log)
+
+    # The scripts are imported and the path to their output csv file is set (the file extension is replaced for other formats), existing result files are cleared so only the results from one run are written in the files
+    modules = {}
+    for name in detectors:
+        module_name = detectors[name]
+        if name not in selected_detectors or module_name in modules:
+            continue
+        module = importlib.import_module(module_name)
+        module.output_csv_path = os.path.join(output_dir, f"{module_name}_results.csv") if output_dir else ''
+        if module.output_csv_path and os.path.exists(findings_path(module.output_csv_path)):
+            os.remove(findings_path(module.output_csv_path))
+        modules[module_name] = module
+
+    # A dictionary for intermediate results shared between the detection functions is initialized, empty at first
+    shared = {'log_path': log_path, 'streaming': streaming, 'traces_per_chunk': traces_per_chunk, 'processes': processes}
+
+    # The selected detection functions are called in the order of the scripts, each of them is measured as a phase, which includes the shared helpers nested in it
+    for name in detectors:
+        if name in selected_detectors:
+            with profile_phase(name, len(df) if df is not None else None):
+                run_detector(name, modules[detectors[name]], df, {**default_parameters[name], **parameters.get(name, {})}, shared)
+
+    # The buffered findings are written to the result files
+    flush_findings()
+
+    # The measurements are written to a report in .json format next to the csv results
+    if profile:
+        write_report(os.path.join(output_dir or '', 'profile_report.json'), log_path=log_path, detectors=[name for name in detectors if name in selected_detectors], streaming=streaming)
+        disable_profiling()
+
+
+if __name__ == "__main__":
+
+    # The path to the event log, the directory for the csv results and the detectors to run can be specified on the command line
+    parser = argparse.ArgumentParser(description="Runs the weasel pattern detectors on one event log, which only gets parsed once")
+    parser.add_argument('log_path', help="path to the event log in .xes format")
+    parser.add_argument('--output-dir', default='', help="directory the results get written to, one file per script, can also be left empty, then this part just gets skipped")
+    parser.add_argument('--format', default='csv', choices=['csv', 'parquet', 'jsonl'], help="format the results get written in")
+    parser.add_argument('--quiet', action='store_true', help="don't print the detected patterns to the console")
+    parser.add_argument('--detectors', nargs='+', choices=list(detectors), help="detection functions to run, all of them are run if left empty")
+    parser.add_argument('--cache-dir', default=None, help="directory the parsed event log gets cached in, the cache is stored next to the log if left empty")
+    parser.add_argument('--streaming', action='store_true', help="stream the log chunk by chunk to the detection functions that only regard events within the same case, for logs that do not fit into memory")
+    parser.add_argument('--traces-per-chunk', type=int, default=1000, help="number of traces in each chunk of the streamed log")
+    parser.add_argument('--processes', type=int, default=1, help="number of processes the cases are partitioned across for the case-local detection functions, 0 uses all cores")
+    parser.add_argument('--calendar', default=None, help="table of shifts in .csv format (columns resource, start, end and optionally weekday and timezone) with the working times used by Overwork Hiding and Social Borrowing")
+    parser.add_argument('--holidays', nargs='+', default=[], help="dates without working time for any resource, e.g. 2023-12-25 2023-12-26")
+    parser.add_argument('--timezone', default=None, help="timezone the working times are given in, the timezone of the log is used if left empty")
+    parser.add_argument('--takeovers', default=None, help="table of boss takeovers in .csv format (columns team, resource and timestamp, one row per resource of a team) used by Boss Mobbing instead of the single boss takeover timestamp")
+    parser.add_argument('--profile', action='store_true', help="measure the wall time, cpu time, processed rows and peak memory of each phase and write them to profile_report.json next to the csv results")
+    args = parser.parse_args()
+
+    if args.output_dir:
+        os.makedirs(args.output_dir, exist_ok=True)
+
+    # The working times are passed to the detection functions that need them, if any of them got specified
+    parameters = {}
+    if args.calendar or args.holidays or args.timezone:
+        calendar = load_calendar(args.calendar, args.timezone, args.holidays) if args.calendar else new_calendar(None, args.timezone, args.holidays)
+
+        # Without a table of shifts, Social Borrowing keeps the default shifts of its script, only with the specified holidays and timezone
+        borrowing_calendar = calendar if args.calendar else load_calendar(importlib.import_module(detectors['detect_social_borrowing']).default_shifts, args.timezone, args.holidays)
+        parameters = {'detect_overwork_hiding': {'calendar': calendar}, 'detect_social_borrowing': {'calendar': borrowing_calendar}}
+
+    # The boss takeovers of the teams are passed to Boss Mobbing, which evaluates all of them on the same group work table
+    if args.takeovers:
+        parameters['detect_boss_mobbing'] = {'takeovers': args.takeovers}
+
+    run_detectors(args.log_path, args.detectors, args.output_dir, parameters, cache_dir=args.cache_dir, streaming=args.streaming, traces_per_chunk=args.traces_per_chunk, profile=args.profile, processes=args.processes or os.cpu_count(), output_format=args.format, quiet=args.quiet)
@@ -0,0 +1,26 @@
+import numpy as np
+from collections import deque
+
+# The running statistics of a stream of values get initialized as a dictionary, the count, mean and sum of squared differences from the mean are updated with Welford's algorithm, only the most recent values (as many as the window holds) are kept for the rolling slope
+def new_running_statistics(window):
+    return {'count': 0, 'mean': 0.0, 'squared_differences': 0.0, 'recent': deque(maxlen=window)}
+
+# The update of the running statistics with a new value gets defined as a function, it takes constant time and memory no matter how many values were regarded before
+def update_running_statistics(statistics, value):
+    statistics['count'] += 1
+    difference = value - statistics['mean']
+    statistics['mean'] += difference / statistics['count']
+    statistics['squared_differences'] += difference * (value - statistics['mean'])
+    statistics['recent'].append(value)
+
+# The variance of the values regarded so far gets defined as a function, it is the population variance just like np.var calculates it
+def running_variance(statistics):
+    return statistics['squared_differences'] / statistics['count'] if statistics['count'] > 0 else np.nan
+
+# The rolling slope gets defined as a function, it is the slope of the least squares line through the most recent values, with the position of each value in the stream as x, so it tells by how much the values grew from one value to the next in the window on average
+def rolling_slope(statistics):
+    recent = statistics['recent']
+    if len(recent) < 2:
+        return np.nan
+    middle = (len(recent) - 1) / 2
+    return sum((position - middle) * value for position, value in enumerate(recent)) / (len(recent) * (len(recent) ** 2 - 1) / 12)
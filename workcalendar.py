@@ -0,0 +1,117 @@
+import pandas as pd
+import numpy as np
+import datetime
+from compactlog import NAT, compact_log
+
+# The length of a day in nanoseconds, the time of day of an event is its timestamp modulo this length
+day_ns = 86400 * 10**9
+
+# The names of the weekdays, the weekday of a shift can be given as its name, its abbreviation or its number (0 is Monday), just like pandas numbers them
+weekday_names = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
+
+# The conversion of a time of day (e.g. '09:00:00' or a datetime.time) to nanoseconds since midnight gets defined as a function
+def time_of_day_ns(value):
+    return pd.Timedelta(str(value)).value
+
+# The conversion of nanoseconds since midnight back to a time of day gets defined as a function, it is used for the times in the findings, which have microsecond precision just like datetime.time
+def ns_to_time(ns):
+    return (datetime.datetime.min + datetime.timedelta(microseconds=int(ns) // 1000)).time()
+
+# The conversion of the weekday of a shift to its number gets defined as a function, an empty weekday means the shift applies to every day of the week
+def weekday_numbers(value):
+    if pd.isna(value) or str(value).strip() == '':
+        return list(range(7))
+    weekday = str(value).strip().lower()
+    if weekday.isdigit() and int(weekday) < 7:
+        return [int(weekday)]
+
+    # Only the full name or the first three letters of a name are accepted, since shorter prefixes like 't' or 's' would match more than one weekday
+    for number, name in enumerate(weekday_names):
+        if weekday in (name, name[:3]):
+            return [number]
+    raise ValueError(f"The weekday {value!r} of a shift is neither a number from 0 to 6, nor the name or the three letter abbreviation of a weekday")
+
+# The creation of a calendar gets defined as a function, a calendar is a dictionary with the start and end of the working time of each resource for each weekday (in nanoseconds since midnight, -1 on days off), the timezone the working times are given in and the holidays, resources without shifts get the default working times on every day
+def new_calendar(shifts=None, timezone=None, holidays=(), default_start='09:00:00', default_end='17:00:00'):
+    return {
+        'shifts': shifts if shifts is not None else {},
+        'timezones': {},
+        'timezone': timezone,
+        'holidays': np.array([pd.Timestamp(holiday).value // day_ns for holiday in holidays], dtype=np.int64),
+        'default': (np.full(7, time_of_day_ns(default_start), dtype=np.int64), np.full(7, time_of_day_ns(default_end), dtype=np.int64))
+    }
+
+# The loading of a calendar from a table of shifts gets defined as a function, the table (a dataframe or the path to a .csv file) has one row per shift with the columns resource, start and end, and optionally weekday (empty for every day) and timezone (empty for the timezone of the calendar)
+def load_calendar(table, timezone=None, holidays=(), default_start='09:00:00', default_end='17:00:00'):
+    if isinstance(table, str):
+        table = pd.read_csv(table, dtype=str)
+    calendar = new_calendar(None, timezone, holidays, default_start, default_end)
+
+    # The shifts of each resource are stored for each weekday, weekdays without a shift are days off
+    for row in table.to_dict('records'):
+        starts, ends = calendar['shifts'].setdefault(row['resource'], (np.full(7, -1, dtype=np.int64), np.full(7, -1, dtype=np.int64)))
+        for weekday in weekday_numbers(row.get('weekday')):
+            starts[weekday], ends[weekday] = time_of_day_ns(row['start']), time_of_day_ns(row['end'])
+        if not pd.isna(row.get('timezone', np.nan)) and str(row['timezone']).strip():
+            calendar['timezones'][row['resource']] = str(row['timezone']).strip()
+    return calendar
+
+# The inference of a calendar from the events of a log gets defined as a function, the working time of each resource starts with its earliest and ends with its latest registered time of day, calculated in one groupby over the log, if a calendar is given only the resources without shifts in it get inferred working times
+def infer_calendar(df, calendar=None):
+    calendar = new_calendar() if calendar is None else {**calendar, 'shifts': dict(calendar['shifts'])}
+    times = local_times(df, calendar)
+    valid = (times['time_of_day'] >= 0) & (times['resource_codes'] >= 0)
+    earliest_and_latest = pd.Series(times['time_of_day'][valid]).groupby(times['resource_codes'][valid]).agg(['min', 'max'])
+    for code, earliest, latest in zip(earliest_and_latest.index, earliest_and_latest['min'], earliest_and_latest['max']):
+        calendar['shifts'].setdefault(times['resource_lookup'][code], (np.full(7, earliest, dtype=np.int64), np.full(7, latest, dtype=np.int64)))
+    return calendar
+
+# The conversion of UTC nanoseconds to the local time of a timezone gets defined as a function, without a timezone the timestamps are left as they are (timestamps without a timezone in the log are regarded as UTC)
+def to_local_ns(utc_ns, timezone):
+    if timezone is None:
+        return utc_ns
+    return pd.DatetimeIndex(utc_ns.view('datetime64[ns]'), tz='UTC').tz_convert(timezone).tz_localize(None).as_unit('ns').asi8
+
+# The local time of each event gets defined as a function, it returns the resource codes, the local day (days since 1970-01-01) and the time of day in nanoseconds (truncated to microseconds, -1 for events without a timestamp), all calculated on the int64 timestamps
+def local_times(df, calendar):
+    compact = compact_log(df)
+    resource_codes = compact.codes['org:resource']
+    resource_lookup = compact.lookup['org:resource']
+    valid = compact.timestamps != NAT
+
+    # The timestamps are regarded in the timezone of the calendar, or in the timezone of the log if the calendar does not specify one, resources with their own timezone are converted separately
+    timezone = calendar['timezone'] if calendar['timezone'] is not None else getattr(df['time:timestamp'].dtype, 'tz', None)
+    local_ns = np.array(to_local_ns(compact.timestamps, timezone))
+    for resource, resource_timezone in calendar['timezones'].items():
+        of_resource = (resource_codes == compact.code_of('org:resource', resource)) & valid
+        local_ns[of_resource] = to_local_ns(compact.timestamps[of_resource], resource_timezone)
+
+    # The day and the time of day are calculated with integer arithmetic
+    days = np.where(valid, local_ns // day_ns, 0)
+    time_of_day = np.where(valid, local_ns % day_ns // 1000 * 1000, -1)
+    return {'resource_codes': resource_codes, 'resource_lookup': resource_lookup, 'days': days, 'time_of_day': time_of_day}
+
+# The lookup of the working time tables of a calendar gets defined as a function, it returns the starts and ends of the working times for the codes of the resources of a log, with one row per resource code (the last row for events without a resource) and one column per weekday
+def working_time_tables(calendar, resource_lookup):
+    resources = list(resource_lookup) + [np.nan]
+    starts = np.stack([calendar['shifts'].get(resource, calendar['default'])[0] for resource in resources])
+    ends = np.stack([calendar['shifts'].get(resource, calendar['default'])[1] for resource in resources])
+    return starts, ends
+
+# The evaluation of a calendar for all events of a log gets defined as a function, it returns the local time and weekday of each event together with the start and end of the working time of its resource on that day (-1 on days off and holidays) and the masks of the events before the start and after the end of the working time
+def evaluate_calendar(df, calendar):
+    times = local_times(df, calendar)
+    starts, ends = working_time_tables(calendar, times['resource_lookup'])
+    weekdays = (times['days'] + 3) % 7
+    rows = np.where(times['resource_codes'] >= 0, times['resource_codes'], len(starts) - 1)
+    holiday = np.isin(times['days'], calendar['holidays'])
+    times['work_start'] = np.where(holiday, -1, starts[rows, weekdays])
+    times['work_end'] = np.where(holiday, -1, ends[rows, weekdays])
+    times['weekdays'] = weekdays
+    times['holiday'] = holiday
+    has_time = times['time_of_day'] >= 0
+    working_day = has_time & (times['work_start'] >= 0)
+    times['day_off'] = has_time & ~working_day
+    times['before_start'] = working_day & (times['time_of_day'] < times['work_start'])
+    times['after_end'] = working_day & (times['time_of_day'] > times['work_end'])
+    return times
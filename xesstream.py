@@ -0,0 +1,82 @@
+import pm4py
+import pandas as pd
+import xml.etree.ElementTree as ET
+from logcache import to_dataframe
+
+# The conversion of the values of the different XES attribute types gets defined here, values of dates are converted together for the whole chunk
+attribute_types = {
+    'string': str,
+    'id': str,
+    'date': str,
+    'int': int,
+    'float': float,
+    'boolean': lambda value: value.lower() == 'true'
+}
+
+# The removal of the namespace from the tag of an XML element gets defined as a function
+def local_tag(element):
+    return element.tag.rsplit('}', 1)[-1]
+
+# The attributes of an XES element (trace or event) are read into a dictionary, nested attributes are skipped
+def read_attributes(element, prefix=''):
+    attributes = {}
+    for child in element:
+        attribute_type = local_tag(child)
+        if attribute_type in attribute_types and 'key' in child.attrib:
+            attributes[prefix + child.attrib['key']] = attribute_types[attribute_type](child.attrib.get('value'))
+    return attributes
+
+# The conversion of the rows of a chunk to a dataframe gets defined as a function, with the same columns pm4py.convert_to_dataframe creates
+def rows_to_dataframe(rows, date_keys):
+    df = pd.DataFrame(rows)
+    for key in date_keys:
+        if key in df.columns:
+            df[key] = pd.to_datetime(df[key], utc=True, format='ISO8601')
+    return df
+
+# The streaming of an event log in .xes format gets defined as a function, the log is parsed incrementally and yielded as dataframes containing a chunk of complete traces, so only one chunk is held in memory at a time
+def iter_traces(log_path, traces_per_chunk=1000):
+
+    # A list for the events of the current chunk and a set for the keys of date attributes are initialized, empty at first
+    rows = []
+    date_keys = set()
+    traces_in_chunk = 0
+    root = None
+
+    # The log is parsed incrementally, each trace is processed as soon as it is completely read
+    for event, element in ET.iterparse(log_path, events=('start', 'end')):
+        if root is None:
+            root = element
+        if event != 'end' or local_tag(element) != 'trace':
+            continue
+
+        # The attributes of the trace get the prefix "case:", just like in the dataframe created by pm4py
+        case_attributes = read_attributes(element, 'case:')
+        for child in element:
+            if local_tag(child) == 'event':
+                rows.append({**read_attributes(child), **case_attributes})
+                date_keys.update(grandchild.attrib['key'] for grandchild in child if local_tag(grandchild) == 'date')
+        date_keys.update('case:' + child.attrib['key'] for child in element if local_tag(child) == 'date')
+
+        # The parsed trace is removed from the XML tree so the memory does not grow with the size of the log
+        root.clear()
+        traces_in_chunk += 1
+
+        # If the chunk is full, it is yielded as a dataframe
+        if traces_in_chunk == traces_per_chunk:
+            yield rows_to_dataframe(rows, date_keys)
+            rows = []
+            traces_in_chunk = 0
+
+    # The remaining traces are yielded as the last chunk
+    if rows:
+        yield rows_to_dataframe(rows, date_keys)
+
+# The iteration through a log in chunks gets defined as a function, so the detection functions can be called either with a log, with the path to an event log in .xes format (which then gets streamed) or with any iterable of dataframes containing complete cases
+def iter_chunks(log, traces_per_chunk=1000):
+    if isinstance(log, str):
+        yield from iter_traces(log, traces_per_chunk)
+    elif isinstance(log, pd.DataFrame) or hasattr(log, 'attributes'):
+        yield to_dataframe(log)
+    else:
+        yield from log